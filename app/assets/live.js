@@ -0,0 +1,152 @@
+// Live graph updates: one EventSource per tab, each message dropped into the
+// live-event store where applyEvent patches it into fig-store; the server is
+// only asked again for a refetch, or for the notes panel when the comment is
+// on the node it shows. checkVersion is the fallback for networks that block
+// the stream: a conditional GET of /api/version that costs a 304 while
+// nothing changed. version-poll only runs while the stream is down.
+
+// Same edits as patch_node_added / patch_node_deleted in chainsmoker_v2.1.py,
+// made on copies: fig-store arrays are shared with the previous store value.
+function spliced(arr, pos, remove, item) {
+    const out = arr.slice();
+    if (item === undefined) {
+        out.splice(pos, remove);
+    } else {
+        out.splice(pos, remove, item);
+    }
+    return out;
+}
+
+function patchNode(store, meta, evt) {
+    const idx = meta.chains.indexOf(evt.chain);
+    if (idx < 0 || evt.pos === undefined) {
+        return null;
+    }
+    const old = store.figure.data[idx];
+    const trace = Object.assign({}, old);
+    if (evt.type === 'node_added') {
+        if (meta.visible.indexOf(evt.tactic) < 0) {
+            return null;
+        }
+        trace.x = spliced(old.x, evt.pos, 0, evt.x);
+        trace.y = spliced(old.y, evt.pos, 0, evt.tactic);
+        trace.customdata = spliced(old.customdata, evt.pos, 0, evt.row_id);
+        trace.text = spliced(old.text, evt.pos, 0, evt.text);
+        // marker colours are just 0..n-1 along the chain
+        trace.marker = Object.assign({}, old.marker, {color: old.marker.color.concat([evt.n - 1])});
+    } else if (evt.type === 'node_deleted') {
+        if (evt.n_before <= 1 || !evt.tactic_left) {
+            return null;    // last node of this tactic → it moves to "missing"
+        }
+        ['x', 'y', 'customdata', 'text'].forEach(function (key) {
+            trace[key] = spliced(old[key], evt.pos, 1);
+        });
+        trace.marker = Object.assign({}, old.marker, {
+            color: old.marker.color.filter(function (c) { return c !== evt.n_before - 1; })
+        });
+    } else {
+        return null;
+    }
+    const data = store.figure.data.slice();
+    data[idx] = trace;
+    return Object.assign({}, store, {figure: Object.assign({}, store.figure, {data: data})});
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    live: {
+        connect: function (clientId) {
+            const poll = function (on) {
+                window.dash_clientside.set_props('version-poll', {disabled: !on});
+            };
+            if (!clientId || window.chainsmokerLive) {
+                return window.dash_clientside.no_update;
+            }
+            if (!window.EventSource) {
+                poll(true);
+                return window.dash_clientside.no_update;
+            }
+            const source = new EventSource('/api/events');
+            source.onmessage = function (e) {
+                window.dash_clientside.set_props('live-event', {data: JSON.parse(e.data)});
+            };
+            // the browser retries a dropped stream by itself (unless the
+            // server refused it outright); poll until it is back, then check
+            // once more for whatever it missed in the meantime
+            let dropped = false;
+            source.onerror = function () {
+                dropped = true;
+                poll(true);
+            };
+            source.onopen = function () {
+                poll(false);
+                if (dropped) {
+                    dropped = false;
+                    window.dash_clientside.set_props('version-poll', {n_intervals: Date.now()});
+                }
+            };
+            window.chainsmokerLive = source;
+            return window.dash_clientside.no_update;
+        },
+
+        // Only when this tab sits exactly at the event's `prev`; otherwise
+        // (gap, windowed or filtered view, several deltas) refetch.
+        applyEvent: function (live, figs, meta, clientId, shownNode) {
+            const noUpdate = window.dash_clientside.no_update;
+            if (!live || !meta || (meta.version || 0) >= live.version) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            const refetch = [noUpdate, noUpdate, live.version, noUpdate];
+            if (meta.version !== live.prev || meta.windowed) {
+                return refetch;
+            }
+
+            const newMeta = Object.assign({}, meta, {version: live.version});
+            const own = live.origin === clientId;
+            // shown-node outlives the graph page, but notes_clickdata's other
+            // inputs don't: only refresh the panel while it is mounted
+            const commented = !own && shownNode !== null && shownNode !== undefined &&
+                document.getElementById('attack-chain-graph') !== null &&
+                live.events.some(function (e) {
+                    return e.type === 'comment' && e.node_id === shownNode;
+                });
+            const refresh = commented ? {node_id: shownNode, version: live.version} : noUpdate;
+            const nodes = live.events.filter(function (e) { return e.type !== 'comment'; });
+            if (own || !nodes.length) {
+                return [noUpdate, newMeta, noUpdate, refresh];  // own change (already patched) / comments only
+            }
+            const patched = (nodes.length === 1 && !meta.filtered && figs)
+                ? patchNode(figs, meta, nodes[0]) : null;
+            if (patched === null) {
+                return [noUpdate, noUpdate, live.version, refresh];
+            }
+            return [patched, newMeta, noUpdate, refresh];
+        },
+
+        // row_id of the node in the notes panel (as hash_node reads it), so
+        // applyEvent can tell whether a comment concerns it
+        shownNode: function (clickData) {
+            const point = clickData && clickData.points && clickData.points[0];
+            const id = point ? parseInt(point.customdata, 10) : NaN;
+            return isNaN(id) ? null : id;
+        },
+
+        checkVersion: async function (n, meta) {
+            const noUpdate = window.dash_clientside.no_update;
+            const headers = {};
+            if (window.chainsmokerVersionTag) {
+                headers['If-None-Match'] = window.chainsmokerVersionTag;
+            }
+            try {
+                const resp = await fetch('/api/version', {headers: headers, cache: 'no-store'});
+                if (resp.status !== 200) {
+                    return noUpdate;    // 304: unchanged
+                }
+                window.chainsmokerVersionTag = resp.headers.get('ETag');
+                const body = await resp.json();
+                return (meta && meta.version === body.version) ? noUpdate : body.version;
+            } catch (e) {
+                return noUpdate;
+            }
+        }
+    }
+});
@@ -0,0 +1,121 @@
+// Pure-UI callbacks: they only shuffle component state, so they run in the
+// browser instead of costing a round-trip to the server each time.
+function dbcAlert(children, props) {
+    return {
+        namespace: 'dash_bootstrap_components',
+        type: 'Alert',
+        props: Object.assign({children: children, is_open: true}, props)
+    };
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    ui: {
+        notesHide: function (nClicks) {
+            return {display: nClicks % 2 === 1 ? 'block' : 'none'};
+        },
+
+        toggleForms: function (nNotes, nNode, openNotes, openNode, clickData) {
+            const noUpdate = window.dash_clientside.no_update;
+            const ctx = window.dash_clientside.callback_context;
+            const trigger = ctx.triggered_id;
+
+            if (trigger === 'btn-toggle-notes') {
+                // no node selected → alert and keep both collapsed
+                if (!clickData || !clickData.points || !clickData.points.length) {
+                    return [false, false, dbcAlert('You must click a node first',
+                                                   {color: 'indianred', duration: 4000, dismissable: true})];
+                }
+                return [!openNotes, false, noUpdate];
+            }
+            if (trigger === 'btn-toggle-node') {
+                return [false, !openNode, noUpdate];
+            }
+            // initial load or anything else – hide both panels
+            return [false, false, noUpdate];
+        },
+
+        toggleDeleteButton: function (clickData) {
+            // same test as hash_node(): an integer row_id in customdata
+            const point = clickData && clickData.points && clickData.points[0];
+            const rowId = point ? parseInt(point.customdata, 10) : NaN;
+            return !rowId;
+        },
+
+        enableWipeButton: function (confirmText, purgeChains) {
+            const locked = confirmText !== 'saturn burger';
+            return [locked, locked || !(purgeChains && purgeChains.length)];
+        },
+
+        updateLabel: function (apiType) {
+            if (apiType === 'kb') {
+                return ['Kibana API Endpoint', 'elastic'];
+            }
+            return ['Base URL', 'onion@fake.local'];
+        },
+
+        storeZoom: function (relayout) {
+            if (!relayout || 'xaxis.autorange' in relayout || 'yaxis.autorange' in relayout) {
+                return null;
+            }
+            const z = {};
+            ['xaxis', 'yaxis'].forEach(function (ax) {
+                const lo = ax + '.range[0]', hi = ax + '.range[1]';
+                if (lo in relayout && hi in relayout) {
+                    z[lo] = relayout[lo];
+                    z[hi] = relayout[hi];
+                }
+            });
+            return Object.keys(z).length ? z : null;
+        },
+
+        // same shape and key order as normalize_filter() on the server, so an
+        // unchanged panel compares equal and doesn't refetch the figure
+        collectFilter: function (chains, operators, tactics, start, end, current) {
+            const dc = window.dash_clientside;
+            const flt = {};
+            [['chains', chains], ['operators', operators], ['tactics', tactics]].forEach(function (kv) {
+                if (kv[1] && kv[1].length) {
+                    flt[kv[0]] = kv[1].slice().sort();
+                }
+            });
+            if (start) {
+                flt.start = start.slice(0, 10);
+            }
+            if (end) {
+                flt.end = end.slice(0, 10);
+            }
+            if (JSON.stringify(flt) === JSON.stringify(current || {})) {
+                throw dc.PreventUpdate;
+            }
+            return [flt, null];
+        },
+
+        exportHref: function (format, gzip) {
+            return '/api/export?format=' + encodeURIComponent(format || 'json') +
+                (gzip ? '&gzip=1' : '');
+        },
+
+        // dcc.Upload hands us a data: URL; post its bytes to /api/import raw
+        // so the server can parse and insert them as they stream in
+        importUpload: async function (contents, filename) {
+            const dc = window.dash_clientside;
+            if (!contents) {
+                throw dc.PreventUpdate;
+            }
+            const file = await (await fetch(contents)).blob();
+            const resp = await fetch('/api/import', {
+                method: 'POST',
+                body: file,
+                headers: {'Content-Type': 'application/octet-stream'}
+            });
+            const body = await resp.json().catch(() => ({error: resp.statusText}));
+            if (!resp.ok) {
+                return [dbcAlert('⚠️ Import of ' + filename + ' failed: ' + body.error,
+                                 {color: 'danger', dismissable: true}), dc.no_update];
+            }
+            return [dbcAlert('✅ Imported ' + body.inserted + ' rows, skipped ' +
+                             body.skipped + ' duplicates.',
+                             {color: 'success', dismissable: true}), body.version];
+        }
+    }
+});
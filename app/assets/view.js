@@ -0,0 +1,137 @@
+// Normal / all-tactics view switch, entirely in the browser: fig-store holds
+// the normal figure plus an overlay (dummy trace, missing-tactic bands, full
+// category array), so flipping the view is composing one or the other and
+// carrying the zoom box across. The figure itself comes from
+// /api/figure/<version>, never through a callback.
+function clamp(i, lo, hi) {
+    return Math.max(lo, Math.min(i, hi));
+}
+
+// y ranges are category indexes, so they have to be translated between the
+// visible-only and all-tactic axes (ceil/floor so partially shown rows stay
+// partially shown).
+function remapZoom(zoom, toNormal, visible, allTacs) {
+    if (!zoom || !('yaxis.range[0]' in zoom)) {
+        return zoom;
+    }
+    const zy0 = zoom['yaxis.range[0]'], zy1 = zoom['yaxis.range[1]'];
+    const src = toNormal ? allTacs : visible;
+    const dst = toNormal ? visible : allTacs;
+
+    const rawY0 = clamp(Math.ceil(zy0), 0, src.length - 1);
+    const rawY1 = clamp(Math.floor(zy1), 0, src.length - 1);
+    if (dst.indexOf(src[rawY0]) < 0 || dst.indexOf(src[rawY1]) < 0) {
+        // zoomed onto a missing tactic – keep the time window, let y autorange
+        const x = {};
+        Object.keys(zoom).filter(k => k.startsWith('xaxis')).forEach(k => { x[k] = zoom[k]; });
+        return Object.keys(x).length ? x : null;
+    }
+    return Object.assign({}, zoom, {
+        'yaxis.range[0]': dst.indexOf(src[rawY0]) - (zy0 - Math.floor(zy0)),
+        'yaxis.range[1]': dst.indexOf(src[rawY1]) + (zy1 - Math.floor(zy1))
+    });
+}
+
+// copy-on-write throughout: the figure objects belong to fig-store
+function composeView(store, normal) {
+    const fig = store.figure;
+    if (normal) {
+        return fig;
+    }
+    const overlay = store.overlay;
+    const layout = Object.assign({}, fig.layout, {
+        shapes: (fig.layout.shapes || []).concat(overlay.shapes),
+        yaxis: Object.assign({}, fig.layout.yaxis, overlay.yaxis)
+    });
+    return Object.assign({}, fig, {data: fig.data.concat(overlay.data), layout: layout});
+}
+
+function applyZoom(fig, zoom) {
+    const layout = Object.assign({}, fig.layout);
+    ['xaxis', 'yaxis'].forEach(function (ax) {
+        const lo = ax + '.range[0]', hi = ax + '.range[1]';
+        if (zoom && lo in zoom && hi in zoom) {
+            layout[ax] = Object.assign({}, layout[ax], {range: [zoom[lo], zoom[hi]]});
+        }
+    });
+    return Object.assign({}, fig, {layout: layout});
+}
+
+// fig-filter → ?chains=a&chains=b&start=... (lists repeat their key)
+function filterQuery(flt) {
+    const params = new URLSearchParams();
+    Object.keys(flt || {}).forEach(function (key) {
+        [].concat(flt[key]).forEach(function (v) { params.append(key, v); });
+    });
+    const query = params.toString();
+    return query ? '?' + query : '';
+}
+
+function sameWindow(win, meta) {
+    return Boolean(win && meta && meta.windowed && win.version === meta.version &&
+                   JSON.stringify(win.filter) === JSON.stringify(meta.filter || {}));
+}
+
+// bumped per loadFigure call, so a slow response can't overwrite a newer one
+let figureRequest = 0;
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    view: {
+        loadFigure: async function (token, flt) {
+            const dc = window.dash_clientside;
+            if (token === null || token === undefined) {
+                throw dc.PreventUpdate;
+            }
+            const mine = ++figureRequest;
+            // stale versions redirect to the current one; fig-meta says which
+            const resp = await fetch('/api/figure/' + token + filterQuery(flt));
+            if (!resp.ok || mine !== figureRequest) {
+                throw dc.PreventUpdate;
+            }
+            const body = await resp.json();
+            if (mine !== figureRequest) {
+                throw dc.PreventUpdate;
+            }
+            return [body.store, body.meta];
+        },
+
+        updateGraph: function (figs, win, nClicks, zoom, flag, meta) {
+            const dc = window.dash_clientside;
+            const toggled = dc.callback_context.triggered_id === 'toggle-list-all-btn';
+            let newZoom = dc.no_update;
+            if (toggled && meta) {
+                flag = 1 - flag;
+                zoom = newZoom = remapZoom(zoom, Boolean(flag), meta.visible, meta.all_tacs);
+            }
+            const label = flag ? 'Show Missing Tactics' : 'Hide Missing Tactics';
+
+            // zoomed into a windowed table: draw the window, if it is one of
+            // this fig-store's (same version and filter)
+            const store = sameWindow(win, meta) ? win : figs;
+            if (!store) {
+                // still loading – the fig-store write will call us again
+                return [dc.no_update, label, flag, newZoom];
+            }
+            const fig = applyZoom(composeView(store, Boolean(flag)), zoom);
+            return [fig, label, flag, newZoom];
+        },
+
+        windowRange: function (zoom, meta, current, win) {
+            const dc = window.dash_clientside;
+            const x = zoom && 'xaxis.range[0]' in zoom && 'xaxis.range[1]' in zoom
+                ? [zoom['xaxis.range[0]'], zoom['xaxis.range[1]']] : null;
+            if (!meta || !meta.windowed || !x) {
+                // the whole (overview) figure comes from fig-store
+                if (!win) {
+                    throw dc.PreventUpdate;
+                }
+                return [dc.no_update, null];
+            }
+            const req = {version: meta.version, filter: meta.filter || {}, range: x};
+            if (win && JSON.stringify(req) === JSON.stringify(current)) {
+                throw dc.PreventUpdate;
+            }
+            return [req, dc.no_update];
+        }
+    }
+});
@@ -0,0 +1,105 @@
+"""Count the server callback requests a typical analyst session makes.
+
+Replays SESSION through the app's callback graph (as served on
+/_dash-dependencies): each changed prop fires the callbacks that take it as an
+Input, their Outputs fire the next ones, and every server callback on the way
+is one POST to /_dash-update-component. Clientside callbacks cost none.
+
+Compare two builds by running it once per file, from the repo root:
+
+    git show <rev>:app/chainsmoker_v2.1.py > /tmp/chainsmoker_old.py
+    python app/bench_callbacks.py /tmp/chainsmoker_old.py
+    python app/bench_callbacks.py app/chainsmoker_v2.1.py
+
+Some props are only written by their clientside callback on big (windowed)
+tables; the default run is a small table and stops there. Add --windowed to
+count the requests a big table makes too. That is an upper bound: a view
+toggle there keeps the time range, so windowRange drops it in the browser.
+
+Importing the app needs its usual environment (DATABASE_URL, OIDC_*,
+APP_FERNET_KEY) and runs its normal start-up against that database; no
+callbacks are executed.
+"""
+import importlib.util
+import os
+import sys
+from collections import Counter, deque
+
+# (action, repeats, props that change); None = initial page load
+SESSION = [
+    ("page load",               1, None),
+    ("click a node",           20, ["attack-chain-graph.clickData"]),
+    ("zoom / pan",             15, ["attack-chain-graph.relayoutData"]),
+    ("toggle missing tactics",  4, ["toggle-list-all-btn.n_clicks"]),
+    ("open/close Add Note",     4, ["btn-toggle-notes.n_clicks"]),
+    ("open/close Add Node",     4, ["btn-toggle-node.n_clicks"]),
+    ("switch API type",         2, ["api-type.value"]),
+    ("type wipe confirmation", 13, ["wipe-confirm.value"]),
+]
+
+# props clientside callbacks only write once the table is windowed
+WINDOWED_ONLY = {"window-range.data"}
+
+def load_app(path):
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, here)        # for utility.*
+    spec = importlib.util.spec_from_file_location("chainsmoker_bench", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def split_outputs(output):
+    outs = output.strip(".").split("...") if output.startswith("..") else [output]
+    return [o.split("@")[0] for o in outs]
+
+def callback_graph(module):
+    deps = module.server.test_client().get("/_dash-dependencies").get_json()
+    graph = []
+    for dep in deps:
+        graph.append({
+            "name": dep["output"],
+            "server": not dep.get("clientside_function"),
+            "initial": not dep.get("prevent_initial_call"),
+            "inputs": {f"{i['id']}.{i['property']}" for i in dep["inputs"]},
+            "outputs": split_outputs(dep["output"]),
+        })
+    return graph
+
+def fire(graph, changed, skip=()):
+    """Server requests caused by `changed` props, following output → input
+    chains; props in `skip` are never written."""
+    requests, seen = 0, set()
+    queue = deque(changed)
+    while queue:
+        prop = queue.popleft()
+        if prop in skip:
+            continue
+        for i, cb in enumerate(graph):
+            if prop in cb["inputs"] and i not in seen:
+                seen.add(i)
+                requests += cb["server"]
+                queue.extend(cb["outputs"])
+    return requests
+
+def main(path, windowed=False):
+    graph = callback_graph(load_app(path))
+    skip = () if windowed else WINDOWED_ONLY
+    per_action = Counter()
+    for action, repeats, props in SESSION:
+        if props is None:
+            per_action[action] = sum(cb["server"] for cb in graph if cb["initial"])
+        else:
+            per_action[action] = repeats * fire(graph, props, skip)
+
+    server = sum(cb["server"] for cb in graph)
+    print(f"{path}: {server} server / {len(graph) - server} clientside callbacks"
+          f" ({'windowed' if windowed else 'small'} table)")
+    for action, repeats, _ in SESSION:
+        print(f"  {action:<24} x{repeats:<3} {per_action[action]:>4} requests")
+    print(f"  {'total':<29} {sum(per_action.values()):>4} requests")
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--windowed"]
+    main(args[0] if args else
+         os.path.join(os.path.dirname(os.path.abspath(__file__)), "chainsmoker_v2.1.py"),
+         windowed="--windowed" in sys.argv)
@@ -1,18 +1,20 @@
 # ─────────────────────────────────────────────────────────────────────────────
 #  CHAINS​MOKER – unified & stateless & uhhhh uhhh uh um
 # ─────────────────────────────────────────────────────────────────────────────
-import os, re, json, math, hashlib
+import os, re, json, hashlib, threading, time, zlib
+from collections import OrderedDict
 from itertools import product
 import dash
-from dash import dcc, html, dash_table, callback, Input, Output, State
+from dash import dcc, html, dash_table, callback, Input, Output, State, Patch, ClientsideFunction, ALL
 import dash_bootstrap_components as dbc
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
 from openpyxl import load_workbook                                   # noqa
 from sqlalchemy import create_engine
 from flask_session import Session
 from flask_sqlalchemy import SQLAlchemy
-from flask import Flask, session, redirect, url_for, request
+from flask import Flask, session, redirect, url_for, request, Response, jsonify
 from authlib.integrations.flask_client import OAuth
 import ssl
 import hashlib
@@ -25,10 +27,19 @@ import certifi
 import secrets
 import jwt
 from werkzeug.middleware.dispatcher import DispatcherMiddleware
-from utility.handler import OnionHandler, KibanaHandler
+from utility.handler import cached_handler, case_stamp
 import utility.crypto as crypto
-from sqlalchemy import text
-from datetime import datetime
+from utility.jobs import JobRunner
+from utility.live import LiveBroker
+from utility.jsonstream import iter_export_rows, read_chunks, peek_bytes, ExportFormatError
+from utility.parquet import (iter_parquet_rows, parquet_zip_chunks, require_pyarrow,
+                             ParquetUnavailable, ZIP_MAGIC)
+import queue
+from sqlalchemy import text, event
+from sqlalchemy.orm import validates
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime, timezone
 import html as h
 import json 
 from sqlalchemy.exc import IntegrityError
@@ -93,9 +104,48 @@ MITRE_TACTICS = [
     "Collection", "C2", "Exfiltration"
 ]
 
+# Draw every chain as one WebGL trace with None gaps instead of one trace per
+# chain. Much faster with hundreds of chains, at the cost of the per-chain legend.
+SINGLE_TRACE = os.environ.get("CHAINSMOKER_SINGLE_TRACE", "0") == "1"
+
+# SVG traces stall pan/zoom past a few thousand markers; switch to WebGL at this
+# many nodes. 0 = always WebGL.
+WEBGL_THRESHOLD = int(os.environ.get("CHAINSMOKER_WEBGL_THRESHOLD", "5000"))
+
+def use_webgl(n_nodes: int) -> bool:
+    return SINGLE_TRACE or n_nodes >= WEBGL_THRESHOLD
+
+# Past this many nodes in view the graph shows a binned density overview and
+# only draws individual nodes once the analyst zooms into a small enough window.
+# No node-by-node figure is bigger than this, so WebGL has to start below it
+# or it would never be used.
+WINDOW_MAX_POINTS = int(os.environ.get("CHAINSMOKER_WINDOW_MAX_POINTS", "10000"))
+WEBGL_THRESHOLD = min(WEBGL_THRESHOLD, WINDOW_MAX_POINTS)
+DENSITY_BINS = 200
+
 def custom_date_parser(date_str: str):
     return pd.to_datetime(date_str, format='%m/%d/%Y, %H%M', errors='coerce')
 
+def parse_mpnet(value):
+    """Naive datetime for a Date/Time MPNET value, or None if it won't parse."""
+    ts = custom_date_parser(value)
+    if pd.isna(ts):
+        ts = pd.to_datetime(value, errors='coerce')   # ISO strings from imports etc.
+    if pd.isna(ts):
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return ts.to_pydatetime()
+
+def parse_mpnet_many(values):
+    """parse_mpnet() over a whole column; the common format is parsed in one go."""
+    raw = pd.Series(values, dtype=object).reset_index(drop=True)
+    ts = pd.to_datetime(raw, format='%m/%d/%Y, %H%M', errors='coerce')
+    out = ts.astype(object).where(ts.notna(), None).tolist()
+    for i in raw.index[ts.isna() & raw.notna()]:
+        out[i] = parse_mpnet(raw[i])
+    return out
+
 def hash_node(clickData):
     """Return row_id from customdata as int, or None if unavailable."""
     if clickData and clickData.get("points"):
@@ -107,10 +157,6 @@ def hash_node(clickData):
     return None
 
 
-def clamp(i: int, lo: int, hi: int) -> int:
-    """Return i clamped to the closed interval [lo, hi]."""
-    return max(lo, min(i, hi))
-
 def memes(i, value):
     match i:
         case 'name':
@@ -184,8 +230,7 @@ class NodeComment(db.Model):
     node_id  = db.Column(
         db.Integer,
         db.ForeignKey("attack_chain.row_id", ondelete="CASCADE"),
-        nullable=False,
-        index=True
+        nullable=False
     )
     operator = db.Column(db.String, nullable=False)
     tactic   = db.Column(db.String, nullable=True)
@@ -193,6 +238,11 @@ class NodeComment(db.Model):
     note     = db.Column(db.Text,   nullable=False)
     created  = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    # a node's comments in display order are one index range scan
+    __table_args__ = (
+        db.Index("ix_node_comments_node_created", "node_id", "created"),
+    )
+
     # back‐reference to the parent chain
     chain    = db.relationship(
         "AttackChain",
@@ -221,6 +271,18 @@ class AttackChain(db.Model):
     operator          = db.Column(db.String,  nullable=True)
     attack_chain_name = db.Column(db.String,  nullable=False)
     created_at        = db.Column(db.DateTime, default=datetime.utcnow)
+    # date_time_mpnet parsed once at write time; sort/window on this instead
+    ts                = db.Column(db.DateTime, nullable=True, index=True)
+    # source case for pulled rows (NULL for manual/uploaded nodes)
+    case_id           = db.Column(db.String,   nullable=True)
+    case_updated_at   = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_attack_chain_chain_ts",  "attack_chain_name", "ts"),
+        db.Index("ix_attack_chain_tactic_ts", "mitre_tactic",      "ts"),
+        db.Index("ix_attack_chain_operator_ts", "operator",        "ts"),
+        db.Index("ux_attack_chain_case_id",   "case_id", unique=True),
+    )
 
     # one‐to‐many to NodeComment, auto‐deleting orphans
     comments = db.relationship(
@@ -230,9 +292,766 @@ class AttackChain(db.Model):
         passive_deletes=True
     )
 
+    @validates("date_time_mpnet")
+    def _sync_ts(self, key, value):
+        self.ts = parse_mpnet(value)
+        return value
+
+class ChainVersion(db.Model):
+    """Single-row counter bumped by every attack_chain / node_comments write."""
+    __tablename__ = "chain_version"
+
+    id      = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+class SyncState(db.Model):
+    """Case-sync high-watermark, one row per API config."""
+    __tablename__ = "sync_state"
+
+    id        = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    api_type  = db.Column(db.String,   nullable=False)
+    base_url  = db.Column(db.String,   nullable=False)
+    username  = db.Column(db.String,   nullable=False, default="")
+    watermark = db.Column(db.DateTime, nullable=True)
+    synced_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("api_type", "base_url", "username", name="uq_sync_state_config"),
+    )
+
+class PurgedCase(db.Model):
+    """Case ids of pulled rows removed by a chain purge; syncs skip them."""
+    __tablename__ = "purged_case"
+
+    case_id   = db.Column(db.String,   primary_key=True)
+    purged_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class ApiConfig(db.Model):
+    """Saved API settings (secrets Fernet-encrypted) for the sync scheduler."""
+    __tablename__ = "api_config"
+
+    id           = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    api_type     = db.Column(db.String,  nullable=False)
+    base_url     = db.Column(db.String,  nullable=False)
+    username     = db.Column(db.String,  nullable=False, default="")
+    password_enc = db.Column(db.Text,    nullable=True)
+    api_key_enc  = db.Column(db.Text,    nullable=True)
+    # opt-in: switched on from the Scheduled Sync list, never by a save
+    auto_sync    = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at   = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("api_type", "base_url", "username", name="uq_api_config"),
+    )
+
+def bump_chain_version(conn):
+    return conn.execute(
+        ChainVersion.__table__.update()
+        .where(ChainVersion.id == 1)
+        .values(version=ChainVersion.version + 1)
+        .returning(ChainVersion.version)
+    ).scalar_one()
+
+def note_chain_bump(session, version):
+    """Remember the version range this transaction moved through, so the live
+    event published on commit can carry it (prev → version)."""
+    bump = session.info.setdefault("chain_bump", {"prev": version - 1})
+    bump["version"] = version
+
+# ─── Comment cache ───────────────────────────────────────────────────────────
+# Clicking around the graph re-reads the same nodes' comments over and over;
+# keep the most recent COMMENT_CACHE_SIZE nodes' lists in process.
+COMMENT_CACHE_SIZE = 1024
+_comment_cache = OrderedDict()
+_comment_cache_lock = threading.Lock()
+# bumped on every invalidation: a read that raced a commit must not be cached
+_comment_generation = 0
+
+def node_comments(node_id):
+    """[{operator, tactic, date, note}] for a node, oldest first."""
+    with _comment_cache_lock:
+        if node_id in _comment_cache:
+            _comment_cache.move_to_end(node_id)
+            return _comment_cache[node_id]
+        generation = _comment_generation
+
+    rows = db.session.execute(
+        db.select(NodeComment.operator, NodeComment.tactic, NodeComment.date, NodeComment.note)
+        .where(NodeComment.node_id == node_id)
+        .order_by(NodeComment.created)
+    ).all()
+    notes = [dict(r._mapping) for r in rows]
+
+    with _comment_cache_lock:
+        if generation == _comment_generation:
+            _comment_cache[node_id] = notes
+            while len(_comment_cache) > COMMENT_CACHE_SIZE:
+                _comment_cache.popitem(last=False)
+    return notes
+
+def invalidate_comments(node_ids):
+    global _comment_generation
+    if not node_ids:
+        return
+    with _comment_cache_lock:
+        _comment_generation += 1
+        for node_id in node_ids:
+            _comment_cache.pop(node_id, None)
+
+def clear_comment_cache():
+    global _comment_generation
+    with _comment_cache_lock:
+        _comment_generation += 1
+        _comment_cache.clear()
+
+# ─── Live updates ────────────────────────────────────────────────────────────
+# Every commit that bumps the version is published to /api/events as
+#   {"prev", "version", "origin", "events": [...]}
+# Clients whose fig-meta sits at `prev` patch the deltas into fig-store in
+# the browser (assets/live.js), without a request; anyone else (missed an
+# event, reconnected) refetches it. Deltas carry the trace edit itself:
+#   node_added   {row_id, chain, tactic, pos, n, x, text}
+#   node_deleted {row_id, chain, tactic, pos, n_before, tactic_left}
+#   comment      {node_id}
+#   reload       bulk writes, anything without a delta
+# pos is the node's index in its chain's trace, n the chain's length after.
+live_events = LiveBroker()
+LIVE_HEARTBEAT = 15     # seconds between keep-alive comments on idle streams
+
+def queue_live_event(evt):
+    """Attach a delta to the current transaction; published after commit."""
+    db.session.info.setdefault("live_events", []).append(evt)
+
+def set_live_origin(client_id):
+    """Tag this request's commits with the browser tab that made them."""
+    db.session.info["live_origin"] = client_id
+
+def chain_position(conn, node):
+    """(index of node in its chain's trace, chain length), counted in SQL in
+    the order load_chain_rows plots them: ts newest first, NULLs last,
+    row_id breaking ties."""
+    c = AttackChain
+    if node.ts is None:
+        before = db.or_(c.ts.is_not(None), c.row_id > node.row_id)
+    else:
+        before = db.or_(c.ts > node.ts, db.and_(c.ts == node.ts, c.row_id > node.row_id))
+    pos, n = conn.execute(
+        db.select(db.func.count(db.case((before, 1))), db.func.count())
+          .where(c.attack_chain_name == node.attack_chain_name)).one()
+    return pos, n
+
+def node_added_event(conn, node):
+    """node_added delta for a flushed node: computed once here, by the
+    writer, instead of by every client that applies it."""
+    pos, n = chain_position(conn, node)
+    hover = hover_text(pd.DataFrame([{
+        "details": node.details, "notes": node.notes, "operator": node.operator,
+        "Attack Chain": node.attack_chain_name}])).iloc[0]
+    return {"type": "node_added", "row_id": node.row_id,
+            "chain": node.attack_chain_name, "tactic": node.mitre_tactic,
+            "pos": pos, "n": n,
+            "x": node.ts.isoformat() if node.ts else None, "text": hover}
+
+# ORM writes bump the version inside their own transaction, so a rollback
+# undoes the bump too. Core/bulk statements must call bump_chain_version().
+@event.listens_for(db.session, "after_flush")
+def bump_on_chain_write(session, flush_context):
+    modified = [o for o in session.dirty if session.is_modified(o)]
+    touched = list(session.new) + list(session.deleted) + modified
+    if not any(isinstance(o, (AttackChain, NodeComment)) for o in touched):
+        return
+    note_chain_bump(session, bump_chain_version(session.connection()))
+
+    comment_nodes = session.info.setdefault("comment_nodes", set())
+    for o in touched:
+        if isinstance(o, NodeComment):
+            comment_nodes.add(o.node_id)
+        elif o in session.deleted and isinstance(o, AttackChain):
+            comment_nodes.add(o.row_id)     # its comments go with it (DB cascade)
+
+    events = session.info.setdefault("live_events", [])
+    added = [o for o in session.new if isinstance(o, AttackChain)]
+    if len(added) == 1:
+        events.append(node_added_event(session.connection(), added[0]))
+    else:
+        # several at once: clients refetch anyway, so skip the deltas
+        events.extend({"type": "node_added", "row_id": o.row_id} for o in added)
+    for o in list(session.new) + list(session.deleted):
+        if isinstance(o, NodeComment):
+            events.append({"type": "comment", "node_id": o.node_id})
+    # AttackChain deletes are queued by the caller, which knows the position
+    if any(isinstance(o, AttackChain) for o in modified):
+        events.append({"type": "reload"})
+
+@event.listens_for(db.session, "after_commit")
+def publish_chain_changes(session):
+    bump = session.info.pop("chain_bump", None)
+    events = session.info.pop("live_events", [])
+    origin = session.info.pop("live_origin", None)
+    comment_nodes = session.info.pop("comment_nodes", set())
+    # invalidate only once the change is visible to other sessions; a bump the
+    # flush hook didn't see (bulk/Core write) may have touched any comment
+    if bump and not events:
+        clear_comment_cache()
+    else:
+        invalidate_comments(comment_nodes)
+    if bump:
+        live_events.publish(dict(bump, origin=origin, events=events or [{"type": "reload"}]))
+
+@event.listens_for(db.session, "after_rollback")
+def drop_chain_changes(session):
+    for key in ("chain_bump", "live_events", "live_origin", "comment_nodes"):
+        session.info.pop(key, None)
+
+def migrate_attack_chain():
+    """Add + backfill attack_chain.ts, add the case columns and create the
+    indexes on tables from older builds."""
+    columns = {c["name"] for c in db.inspect(db.engine).get_columns("attack_chain")}
+    with db.engine.begin() as conn:
+        for name, ddl in (("case_id", "VARCHAR"), ("case_updated_at", "TIMESTAMP")):
+            if name not in columns:
+                conn.execute(text(f"ALTER TABLE attack_chain ADD COLUMN {name} {ddl}"))
+
+    if "ts" not in columns:
+        # one transaction: a crash half way through leaves no column, so the
+        # next start simply tries again
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE attack_chain ADD COLUMN ts TIMESTAMP"))
+            last = 0
+            while True:
+                rows = conn.execute(text(
+                    "SELECT row_id, date_time_mpnet FROM attack_chain "
+                    "WHERE row_id > :last ORDER BY row_id LIMIT 5000"), {"last": last}).all()
+                if not rows:
+                    break
+                conn.execute(
+                    text("UPDATE attack_chain SET ts = :ts WHERE row_id = :row_id"),
+                    [{"row_id": r.row_id, "ts": parse_mpnet(r.date_time_mpnet)} for r in rows])
+                last = rows[-1].row_id
+            bump_chain_version(conn)
+
+    for index in AttackChain.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
 # create both `flask_sessions` + your app tables if missing
 with server.app_context():
     db.create_all()
+    if db.session.get(ChainVersion, 1) is None:
+        try:
+            db.session.add(ChainVersion(id=1, version=0))
+            db.session.commit()
+        except IntegrityError:      # another worker seeded it first
+            db.session.rollback()
+    migrate_attack_chain()
+    for index in NodeComment.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
+# ─── Bulk ingest ─────────────────────────────────────────────────────────────
+# handler.cases column → attack_chain column
+CASE_COLUMNS = {
+    "Date/Time MPNET":    "date_time_mpnet",
+    "MITRE Tactic":       "mitre_tactic",
+    "Source Hostname/IP": "src_ip",
+    "Target Hostname/IP": "dst_ip",
+    "Details":            "details",
+    "Notes":              "notes",
+    "Operator":           "operator",
+    "Attack Chain":       "attack_chain_name",
+}
+INGEST_BATCH_SIZE = 1000
+SYNC_PER_PAGE = int(os.environ.get("CHAINSMOKER_SYNC_PER_PAGE", "100"))
+SYNC_TAG = "chainsmoker"
+# seconds between scheduled syncs of every saved API config; 0 disables
+SYNC_INTERVAL = int(os.environ.get("CHAINSMOKER_SYNC_INTERVAL", "300"))
+# how often open dashboards ask /api/version whether the data moved (ms),
+# only while their /api/events stream is down (assets/live.js switches it)
+REFRESH_INTERVAL_MS = int(os.environ.get("CHAINSMOKER_REFRESH_INTERVAL_MS", "30000"))
+
+def case_records(df_cases):
+    """attack_chain insert dicts for a handler.cases frame, ts pre-parsed and
+    keyed on the source case id / updated_at."""
+    if df_cases.empty:
+        return []
+    cols = df_cases[list(CASE_COLUMNS)].rename(columns=CASE_COLUMNS)
+    cols = cols.astype(object).where(cols.notna(), None)
+    records = cols.to_dict("records")
+
+    # never-edited cases carry no updated_at; fall back to created_at
+    stamp = df_cases.get("updated_at", pd.Series(None, index=df_cases.index))
+    stamp = stamp.fillna(df_cases.get("created_at"))
+    stamp = pd.to_datetime(stamp, utc=True, errors="coerce").dt.tz_localize(None)
+    case_ids = df_cases.get("id", pd.Series(None, index=df_cases.index))
+
+    now = datetime.utcnow()
+    for rec, ts, cid, upd in zip(records, parse_mpnet_many(cols["date_time_mpnet"]),
+                                 case_ids, stamp):
+        rec["ts"] = ts
+        rec["created_at"] = now
+        rec["case_id"] = None if pd.isna(cid) else str(cid)
+        rec["case_updated_at"] = None if pd.isna(upd) else upd.to_pydatetime()
+    return records
+
+def dialect_insert(table):
+    """INSERT construct with ON CONFLICT support for the bound engine."""
+    if db.engine.dialect.name == "sqlite":
+        return sqlite_insert(table)
+    return pg_insert(table)
+
+def bulk_upsert_cases(df_cases, progress=None):
+    """Write a handler.cases frame into attack_chain, INGEST_BATCH_SIZE rows per
+    INSERT ... ON CONFLICT (case_id) DO UPDATE.
+
+    Rows whose case_updated_at hasn't changed are left alone, so pulling the
+    same cases again is a no-op; cases from purged chains (purged_case) are
+    skipped and counted as unchanged. Returns (rows written, rows unchanged,
+    rows per second); progress(stage, done, total) is called per batch.
+    """
+    started = time.perf_counter()
+    records = case_records(df_cases)
+    # one statement may not touch the same conflict row twice: keep the last
+    # copy of each case id
+    keyed = {rec["case_id"]: rec for rec in records if rec["case_id"] is not None}
+    purged = set(db.session.scalars(db.select(PurgedCase.case_id)))
+    total = len(records)
+    records = ([rec for rec in records if rec["case_id"] is None]
+               + [rec for cid, rec in keyed.items() if cid not in purged])
+
+    table = AttackChain.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.case_id],
+        set_={col: stmt.excluded[col] for col in
+              [*CASE_COLUMNS.values(), "ts", "case_updated_at"]},
+        where=table.c.case_updated_at.is_distinct_from(stmt.excluded.case_updated_at),
+    ).returning(table.c.row_id)
+
+    written = 0
+    for i in range(0, len(records), INGEST_BATCH_SIZE):
+        written += len(db.session.execute(stmt, records[i:i + INGEST_BATCH_SIZE]).all())
+        if progress:
+            progress("writing rows", min(i + INGEST_BATCH_SIZE, len(records)), len(records))
+    if written:
+        # Core insert skips the ORM hook
+        note_chain_bump(db.session, bump_chain_version(db.session.connection()))
+    db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    return written, total - written, (total / elapsed if elapsed else 0.0)
+
+def sync_cases(handler, api_type, base_url, username, progress=None):
+    """Fetch the cases changed since this config's watermark and upsert them.
+
+    The watermark only moves once the rows are committed, so a failed pull is
+    simply retried from the same point next time. Returns (cases fetched,
+    rows written, rows unchanged, rows per second).
+    """
+    username = username or ""
+    state = SyncState.query.filter_by(
+        api_type=api_type, base_url=base_url, username=username).first()
+    if state is None:
+        state = SyncState(api_type=api_type, base_url=base_url, username=username)
+        db.session.add(state)
+
+    cases = handler.changed_cases(since=state.watermark, per_page=SYNC_PER_PAGE,
+                                  tags=[SYNC_TAG], progress=progress)
+    stamps = [s for c in cases
+              for s in (case_stamp(c, "updated_at"), case_stamp(c, "created_at")) if s]
+    cases = [c for c in cases if SYNC_TAG in c.get("tags", [])]
+
+    handler.cases_to_dataframe(cases)
+    written, unchanged, rate = bulk_upsert_cases(handler.cases, progress)
+
+    if stamps:
+        state.watermark = max(stamps + ([state.watermark] if state.watermark else []))
+    state.synced_at = datetime.utcnow()
+    db.session.commit()
+    return len(cases), written, unchanged, rate
+
+# ─── Background pulls ────────────────────────────────────────────────────────
+pull_jobs = JobRunner(max_workers=2)
+
+def run_pull(job, api_type, base_url, user, pwd, key):
+    """Job body for Pull Cases: sync, then warm the figure cache so the next
+    fig-store read is instant."""
+    with server.app_context():
+        job.progress("connecting")
+        with cached_handler(api_type, base_url, user, pwd, key) as handler:
+            fetched, written, unchanged, rate = sync_cases(
+                handler, api_type, base_url, user, job.progress)
+        job.progress("refreshing graph")
+        get_figures()
+    return {"fetched": fetched, "written": written,
+            "unchanged": unchanged, "rate": rate}
+
+def schedule_syncs():
+    """Queue a pull for every saved config with auto-sync on; configs already
+    pulling are skipped. One broken config (secrets that no longer decrypt
+    after a key rotation, say) is logged and doesn't hold up the rest."""
+    with server.app_context():
+        configs = ApiConfig.query.filter_by(auto_sync=True).all()
+        for cfg in configs:
+            try:
+                pwd = crypto.decrypt_secret(cfg.password_enc) if cfg.password_enc else None
+                key = crypto.decrypt_secret(cfg.api_key_enc) if cfg.api_key_enc else None
+                pull_jobs.submit((cfg.api_type, cfg.base_url, cfg.username),
+                                 run_pull, cfg.api_type, cfg.base_url, cfg.username, pwd, key)
+            except Exception:
+                server.logger.exception("scheduled sync of %s %s (%s) skipped",
+                                        cfg.api_type, cfg.base_url, cfg.username)
+
+API_TYPE_LABELS = {"so": "Security Onion", "kb": "Kibana"}
+
+def api_config_options():
+    """(options, ids with auto-sync on) for the saved-configs switches."""
+    synced = {(s.api_type, s.base_url, s.username): s.synced_at
+              for s in SyncState.query.all()}
+    options, on = [], []
+    for cfg in ApiConfig.query.order_by(ApiConfig.id).all():
+        label = (f"{API_TYPE_LABELS.get(cfg.api_type, cfg.api_type)} · {cfg.base_url}"
+                 f" ({cfg.username or 'API key'})")
+        last = synced.get((cfg.api_type, cfg.base_url, cfg.username))
+        label += f" · last synced {last:%Y-%m-%d %H:%M} UTC" if last else " · never synced"
+        options.append({"label": label, "value": cfg.id})
+        if cfg.auto_sync:
+            on.append(cfg.id)
+    return options, on
+
+def start_sync_scheduler():
+    if SYNC_INTERVAL <= 0:
+        return None
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(SYNC_INTERVAL):
+            try:
+                schedule_syncs()
+            except Exception:
+                server.logger.exception("scheduled case sync failed")
+
+    threading.Thread(target=loop, name="chainsmoker-sync", daemon=True).start()
+    return stop
+
+@server.route("/api/version")
+def data_version():
+    """Current chain/comment data version; ETag'd so an unchanged poll is a 304."""
+    version = chain_version()
+    response = jsonify(version=version)
+    response.set_etag(str(version))
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+@server.route("/api/figure/<int:version>")
+def figure_data(version):
+    """fig-store + fig-meta for one data version (assets/view.js loadFigure).
+
+    The query string is the fig-filter (?chains=a&chains=b&tactics=...&start=
+    &end=); only matching nodes are drawn. A version that has moved on
+    redirects to the current one, filter kept. The body never changes for a
+    given version and filter, so a revalidation is a 304 that skips the build.
+    """
+    try:
+        flt = normalize_filter(request.args.to_dict(flat=False))
+    except ValueError as e:
+        return jsonify(error=f"bad filter: {e}"), 400
+    etag = f"{version}:{hashlib.sha1(filter_key(flt).encode()).hexdigest()[:16]}"
+
+    def moved_to(current):
+        # the raw query string, not url_for(**args): keys such as ?version=
+        # or ?_anchor= would collide with url_for's own arguments
+        url = url_for("figure_data", version=current)
+        query = request.query_string.decode()
+        return redirect(f"{url}?{query}" if query else url)
+
+    current = chain_version()
+    if version != current:
+        return moved_to(current)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        body = fig_payload(version, flt)
+        if body is None:     # written to between the two reads
+            return moved_to(chain_version())
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@server.route("/api/events")
+def live_stream():
+    """Server-sent events: one JSON message per committed chain/comment change."""
+    q = live_events.subscribe()
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    evt = q.get(timeout=LIVE_HEARTBEAT)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(evt)}\n\n"
+        finally:
+            live_events.unsubscribe(q)
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ─── Export ──────────────────────────────────────────────────────────────────
+# parents first, so an import can resolve every comment's node_id
+EXPORT_TABLES = (AttackChain.__table__, NodeComment.__table__)
+EXPORT_BATCH_SIZE = 1000
+
+def _export_default(o):
+    if isinstance(o, datetime):
+        return o.isoformat()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+def export_batches(conn, table):
+    """Lists of row dicts, EXPORT_BATCH_SIZE at a time off a server-side cursor."""
+    q = (db.select(table).order_by(*table.primary_key)
+           .execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for batch in conn.execute(q).mappings().partitions():
+        yield [dict(row) for row in batch]
+
+def export_chunks(engine, fmt):
+    """The export as chunks, one per batch (per row group for parquet).
+
+    json:    {"attack_chain": [...], "node_comments": [...]}, the shape
+             ingest_upload has always read
+    ndjson:  one {"table": ..., "row": {...}} object per line
+    parquet: a zip of attack_chain.parquet and node_comments.parquet (bytes)
+    """
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # one snapshot for both tables, so no comment outlives its node
+            conn.execution_options(isolation_level="REPEATABLE READ")
+        with conn.begin():
+            if fmt == "parquet":
+                yield from parquet_zip_chunks(EXPORT_TABLES,
+                                              lambda table: export_batches(conn, table))
+                return
+            for i, table in enumerate(EXPORT_TABLES):
+                if fmt == "json":
+                    yield ("{" if i == 0 else "\n],\n") + json.dumps(table.name) + ": ["
+                sep = "\n"
+                for batch in export_batches(conn, table):
+                    if fmt == "ndjson":
+                        yield "".join(json.dumps({"table": table.name, "row": row},
+                                                 default=_export_default) + "\n"
+                                      for row in batch)
+                    else:
+                        yield sep + ",\n".join(json.dumps(row, default=_export_default)
+                                                for row in batch)
+                        sep = ",\n"
+            if fmt == "json":
+                yield "\n]}\n"
+
+def gzip_chunks(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)     # wbits 31: gzip container
+    for chunk in chunks:
+        data = z.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield z.flush()
+
+@server.route("/api/export")
+def export_data():
+    """Stream both tables for download in constant memory.
+
+    ?format=json (default), ndjson or parquet; ?gzip=1 compresses the text
+    formats on the fly (Parquet pages are compressed already).
+    """
+    fmt = request.args.get("format", "json")
+    if fmt not in ("json", "ndjson", "parquet"):
+        return f"Unknown export format {fmt!r}", 400
+    if fmt == "parquet":
+        try:
+            require_pyarrow()
+        except ParquetUnavailable as e:
+            return str(e), 501
+
+    # the body is generated after this returns, outside the app context
+    chunks = export_chunks(db.engine, fmt)
+    if fmt == "parquet":
+        return Response(chunks, mimetype="application/zip", headers={
+            "Content-Disposition": 'attachment; filename="chainsmoker_export.parquet.zip"',
+            "X-Accel-Buffering": "no",
+        })
+    filename = f"chainsmoker_export.{fmt}"
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    if request.args.get("gzip") == "1":
+        chunks, filename, mimetype = gzip_chunks(chunks), filename + ".gz", "application/gzip"
+    return Response(chunks, mimetype=mimetype, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Accel-Buffering": "no",
+    })
+
+# ─── Import ──────────────────────────────────────────────────────────────────
+def _import_datetime(value):
+    """Exported timestamps are ISO strings; store them naive UTC like the rest."""
+    if not isinstance(value, str):
+        return value
+    try:
+        ts = datetime.fromisoformat(value)
+    except ValueError:
+        raise ExportFormatError(f"bad timestamp {value!r}") from None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+def import_records(table, rows, now):
+    """Insert dicts for one batch of exported rows: unknown keys dropped,
+    timestamps parsed, ts re-derived from date_time_mpnet."""
+    names = [c.name for c in table.columns]
+    stamps = [c.name for c in table.columns if isinstance(c.type, db.DateTime)]
+    records = []
+    for row in rows:
+        if not isinstance(row, dict):
+            raise ExportFormatError(f"{table.name} rows must be objects")
+        rec = {name: row.get(name) for name in names}
+        for name in stamps:
+            rec[name] = _import_datetime(rec[name])
+        records.append(rec)
+
+    if table is AttackChain.__table__:
+        for rec, ts in zip(records, parse_mpnet_many([r["date_time_mpnet"] for r in records])):
+            rec["ts"] = ts
+            rec["created_at"] = rec["created_at"] or now
+    else:
+        for rec in records:
+            rec["created"] = rec["created"] or now
+    return records
+
+def import_rows(rows):
+    """Insert exported (table, row) pairs, INGEST_BATCH_SIZE per
+    INSERT ... ON CONFLICT DO NOTHING, so the database does the duplicate
+    check against its own keys (row_id/id, case_id).
+
+    Comments whose node is neither in the table nor earlier in the file are
+    skipped too. One transaction; returns (inserted, skipped).
+    """
+    tables = {t.name: t for t in EXPORT_TABLES}
+    pending = {name: [] for name in tables}
+    counts = {"inserted": 0, "skipped": 0}
+    now = datetime.utcnow()
+
+    def flush(name):
+        table = tables[name]
+        # parents first, so a comment batch can see the nodes it points at
+        for parent in EXPORT_TABLES[:EXPORT_TABLES.index(table)]:
+            flush(parent.name)
+        if not pending[name]:
+            return
+        records, pending[name] = import_records(table, pending[name], now), []
+
+        if table is NodeComment.__table__:
+            node_ids = {r["node_id"] for r in records}
+            known = set(db.session.execute(
+                db.select(AttackChain.row_id).where(AttackChain.row_id.in_(node_ids))).scalars())
+            orphans = sum(r["node_id"] not in known for r in records)
+            records = [r for r in records if r["node_id"] in known]
+            counts["skipped"] += orphans
+            if not records:
+                return
+
+        stmt = (dialect_insert(table).on_conflict_do_nothing()
+                .returning(*table.primary_key.columns))
+        inserted = len(db.session.execute(stmt, records).all())
+        counts["inserted"] += inserted
+        counts["skipped"] += len(records) - inserted
+
+    try:
+        for name, row in rows:
+            if name not in tables:
+                continue
+            pending[name].append(row)
+            if len(pending[name]) >= INGEST_BATCH_SIZE:
+                flush(name)
+        flush(EXPORT_TABLES[-1].name)
+
+        if counts["inserted"]:
+            reset_id_sequences()
+            # Core inserts skip the ORM hook
+            note_chain_bump(db.session, bump_chain_version(db.session.connection()))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return counts["inserted"], counts["skipped"]
+
+def reset_id_sequences():
+    """Imported rows bring their own ids; move Postgres' serial sequences past
+    them so the next ordinary insert doesn't collide."""
+    if db.engine.dialect.name != "postgresql":
+        return
+    for table in EXPORT_TABLES:
+        pk = table.primary_key.columns[0].name
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', '{pk}'), "
+            f"COALESCE(MAX({pk}), 0) + 1, false) FROM {table.name}"))
+
+@server.route("/api/import", methods=["POST"])
+def import_data():
+    """Import an /api/export file sent as the raw request body: JSON or
+    NDJSON (optionally gzipped), parsed and inserted as it streams in, or the
+    Parquet zip."""
+    magic, chunks = peek_bytes(read_chunks(request.stream), len(ZIP_MAGIC))
+    try:
+        if magic == ZIP_MAGIC:
+            rows = iter_parquet_rows(chunks, [t.name for t in EXPORT_TABLES],
+                                     INGEST_BATCH_SIZE)
+        else:
+            rows = iter_export_rows(chunks)
+        inserted, skipped = import_rows(rows)
+    except ParquetUnavailable as e:
+        return jsonify(error=str(e)), 501
+    except (ExportFormatError, IntegrityError) as e:
+        return jsonify(error=str(getattr(e, "orig", e))), 400
+    return jsonify(inserted=inserted, skipped=skipped, version=chain_version())
+
+# ─── Wipe / purge ────────────────────────────────────────────────────────────
+def truncate_chains():
+    """Empty attack_chain, node_comments, the sync watermarks and the purged
+    case ids (so the next pull starts over and brings everything back) in
+    the current transaction."""
+    if db.engine.dialect.name == "postgresql":
+        # no per-row WAL, cascade checks or dead tuples for autovacuum to chase
+        db.session.execute(text(
+            "TRUNCATE TABLE node_comments, attack_chain, sync_state, purged_case "
+            "RESTART IDENTITY CASCADE"))
+        return
+    for table in (NodeComment.__table__, AttackChain.__table__,
+                  SyncState.__table__, PurgedCase.__table__):
+        db.session.execute(table.delete())
+
+def purge_chains(names):
+    """Delete the named attack chains and their comments in the current
+    transaction. Returns (nodes, comments) deleted.
+
+    The watermarks stay put, and the case ids of pulled rows are recorded in
+    purged_case so later syncs don't bring them back when the cases change
+    upstream; only a full wipe clears that list.
+    """
+    in_chains = AttackChain.attack_chain_name.in_(names)
+    db.session.execute(
+        dialect_insert(PurgedCase.__table__).from_select(
+            ["case_id", "purged_at"],
+            db.select(AttackChain.case_id, db.literal(datetime.utcnow(), db.DateTime))
+              .where(in_chains, AttackChain.case_id.is_not(None)))
+        .on_conflict_do_nothing())
+    comments = db.session.execute(NodeComment.__table__.delete().where(
+        NodeComment.node_id.in_(db.select(AttackChain.row_id).where(in_chains)))).rowcount
+    nodes = db.session.execute(AttackChain.__table__.delete().where(in_chains)).rowcount
+    return nodes, comments
+
+def chain_options():
+    """purge-chains dropdown options: every chain with its node count."""
+    rows = db.session.execute(
+        db.select(AttackChain.attack_chain_name, db.func.count())
+          .group_by(AttackChain.attack_chain_name)
+          .order_by(AttackChain.attack_chain_name)).all()
+    return [{"label": f"{name} ({n:,} nodes)", "value": name} for name, n in rows]
 
 # ─── OAuth Setup ─────────────────────────────────────────────────────────
 if requireAuth:
@@ -398,16 +1217,19 @@ if requireAuth:
 #  FIGURE BUILD
 # ─────────────────────────────────────────────────────────────────────────────
 
-def create_trace(chain_df, chain_id):
-    hover = [
-        f"<b>Details:</b> {d}<br><b>Notes:</b> {n}<br><b>Found&nbsp;By:</b> {o}"
-        f"<br><b>Attack&nbsp;Chain:</b> {ac}"
-        for d, n, o, ac in zip(chain_df['details'],
-                               chain_df['notes'],
-                               chain_df['operator'],
-                               chain_df['Attack Chain'])
-    ]
-    return go.Scatter(
+def hover_text(df_local):
+    """Vectorised hover strings for every row of df_local."""
+    # astype(str) keeps missing values missing, so spell them out like an f-string would
+    def col(name):
+        return df_local[name].fillna('None').astype(str)
+
+    return ("<b>Details:</b> " + col('details')
+            + "<br><b>Notes:</b> " + col('notes')
+            + "<br><b>Found&nbsp;By:</b> " + col('operator')
+            + "<br><b>Attack&nbsp;Chain:</b> " + col('Attack Chain'))
+
+def create_trace(chain_df, chain_id, trace_cls=go.Scatter):
+    return trace_cls(
         x=chain_df['Date/Time MPNET'].tolist() + [None],
         y=chain_df['MITRE Tactic'].tolist()     + [None],
         customdata=chain_df['row_id'].tolist() if 'row_id' in chain_df.columns else None,
@@ -417,19 +1239,88 @@ def create_trace(chain_df, chain_id):
                     colorscale='sunset',
                     line=dict(width=1, color='DarkSlateGrey')),
         line=dict(color='grey', width=2),
-        text=hover, hoverinfo='text',
+        text=hover_text(chain_df).tolist(), hoverinfo='text',
         showlegend=True, name=str(chain_id)
     )
-    
 
-def chainsmoker(df_local):
+def create_merged_trace(df_local):
+    """One Scattergl trace for every chain, chains separated by None gaps."""
+    df_c = df_local.dropna(subset=['Attack Chain'])
+    groups = df_c.groupby('Attack Chain', sort=False)
+    df_c = df_c.assign(hover=hover_text(df_c),
+                       chain_no=groups.ngroup(), pos=groups.cumcount())
+
+    # one all-null row per chain, sorted in right after that chain's last point
+    gaps = pd.DataFrame({'chain_no': range(groups.ngroups), 'pos': len(df_c)})
+    df_c = pd.concat([df_c, gaps], ignore_index=True).sort_values(['chain_no', 'pos'])
+    gap = df_c['row_id'].isna()
+
+    def col(series):
+        return series.astype(object).where(~gap & series.notna(), None).tolist()
+
+    return go.Scattergl(
+        x=col(df_c['Date/Time MPNET']),
+        y=col(df_c['MITRE Tactic']),
+        customdata=col(df_c['row_id'].astype('Int64')),
+        mode='lines+markers',
+        marker=dict(size=12, opacity=.8,
+                    color=df_c['pos'].where(~gap, 0).astype(int).tolist(),
+                    colorscale='sunset',
+                    line=dict(width=1, color='DarkSlateGrey')),
+        line=dict(color='grey', width=2),
+        text=col(df_c['hover']), hoverinfo='text',
+        showlegend=True, name='All Chains'
+    )
+
+
+def chainsmoker(df_local, present=None):
     """Return (fig_normal, fig_all, missing, visible, all_tactic_list) from given dataframe."""
     normal = go.Figure(layout=build_base_layout())
-    for cid in df_local['Attack Chain'].dropna().unique():
-        normal.add_trace(create_trace(df_local[df_local['Attack Chain'] == cid], cid))
+    if SINGLE_TRACE:
+        normal.add_trace(create_merged_trace(df_local))
+    else:
+        # groupby(sort=False) keeps unique()'s first-seen order in one pass;
+        # add_traces once, since every add_trace call re-copies the figure
+        trace_cls = go.Scattergl if use_webgl(len(df_local)) else go.Scatter
+        normal.add_traces([
+            create_trace(chain_df, cid, trace_cls)
+            for cid, chain_df in df_local.groupby('Attack Chain', sort=False)
+        ])
+
+    if present is None:
+        present = set(df_local['MITRE Tactic'].unique())
+    return tactic_views(normal, present, df_local['Date/Time MPNET'].min())
 
+def density_figures(counts, present, x0):
+    """Like chainsmoker(), but one marker per (time bin, tactic) sized by node count.
+
+    counts: density_counts() output.
+    """
+    hover = (counts['n'].astype(str) + " nodes in " + counts['chains'].astype(str)
+             + " chain(s)<br>around " + counts['bin'].dt.strftime('%m/%d/%Y, %H%M')
+             + "<br><i>zoom in for individual nodes</i>")
+
+    normal = go.Figure(layout=build_base_layout())
+    normal.add_trace(go.Scattergl(
+        x=counts['bin'].tolist(), y=counts['MITRE Tactic'].tolist(),
+        mode='markers',
+        marker=dict(size=(6 + 18 * (counts['n'] / counts['n'].max()) ** .5).tolist(),
+                    opacity=.8, color=counts['n'].tolist(), colorscale='sunset',
+                    line=dict(width=1, color='DarkSlateGrey')),
+        text=hover.tolist(), hoverinfo='text',
+        showlegend=True, name='Node density'
+    ))
+    return tactic_views(normal, present, x0)
+
+def tactic_views(normal, present, x0):
+    """Finish the normal figure and derive the all-tactics one from it.
+
+    present: tactics to treat as populated. Windowed views pass the whole
+    table's so the y-axis doesn't jump around as the analyst zooms.
+    x0: where to park the invisible trace that pins every tactic row.
+    """
     all_tacs = MITRE_TACTICS[::-1]  # top → bottom
-    visible = [t for t in all_tacs if t in df_local['MITRE Tactic'].unique()]
+    visible = [t for t in all_tacs if t in present]
     missing = [t for t in all_tacs if t not in visible]
     visible.reverse()
 
@@ -437,7 +1328,6 @@ def chainsmoker(df_local):
                                 'categoryarray': visible[::-1]})
 
     all_fig = go.Figure(normal.to_plotly_json())
-    x0 = df_local['Date/Time MPNET'].min()
 
     all_fig.add_trace(go.Scatter(
         x=[x0] * len(all_tacs), y=all_tacs, mode='lines+markers',
@@ -453,30 +1343,318 @@ def chainsmoker(df_local):
 
     return normal, all_fig, missing, visible[::-1], all_tacs
 
-def chainsmoker_db():
-    with server.app_context():
-        # Read from PostgreSQL table "attack_chain"
-        df_db = pd.read_sql_table("attack_chain", con=db.engine)
+def prepare_chain_df(df_db):
+    """Rename DB columns to the names the figures expect."""
+    df_db = df_db.drop(columns=['date_time_mpnet']).rename(columns={
+        'ts': 'Date/Time MPNET',
+        'mitre_tactic': 'MITRE Tactic',
+        'attack_chain_name': 'Attack Chain',
+    })
 
-        # Make sure column names match your expected df columns or rename accordingly
-        # For example, if your DB columns don't match original df columns exactly, rename here:
-        df_db.rename(columns={
-            'date_time_mpnet': 'Date/Time MPNET',
-            'mitre_tactic': 'MITRE Tactic',
-            'attack_chain_name': 'Attack Chain',
-            # add other renames if needed to align with original df
-        }, inplace=True)
+    # all-NULL timestamps come back as object; keep the dtype uniform
+    df_db['Date/Time MPNET'] = pd.to_datetime(df_db['Date/Time MPNET'])
 
-        # Convert date string column to datetime if necessary, matching original parsing
-        df_db['Date/Time MPNET'] = pd.to_datetime(df_db['Date/Time MPNET'], errors='coerce')
+    # read_sql_table hands back all-null text columns as NaN, read_sql as None;
+    # pin them to None so hover text doesn't depend on which one loaded the rows
+    text_cols = ['details', 'notes', 'operator']
+    df_db[text_cols] = df_db[text_cols].astype(object).where(df_db[text_cols].notna(), None)
+    return df_db
 
-        # Sort descending as original
-        df_db = df_db.sort_values(by='Date/Time MPNET', ascending=False)
+def load_chain_rows(*where):
+    """attack_chain rows matching `where`, newest first as the traces plot them.
 
-        return chainsmoker(df_db)
+    Sorting happens in SQL on the typed ts column; row_id breaks ties so a
+    chain orders the same whether it is loaded alone or with the whole table.
+    """
+    q = (db.select(AttackChain).where(*where)
+           .order_by(AttackChain.ts.desc().nullslast(), AttackChain.row_id.desc()))
+    return prepare_chain_df(pd.read_sql(q, con=db.engine))
+
+def present_tactics(*where):
+    return set(db.session.execute(
+        db.select(AttackChain.mitre_tactic).where(*where).distinct()).scalars())
+
+def count_nodes(*where):
+    return db.session.execute(
+        db.select(db.func.count(AttackChain.row_id)).where(*where)
+    ).scalar()
+
+def density_counts(lo, hi, *where):
+    """Node counts per (time bin, MITRE tactic) between lo and hi, grouped in SQL."""
+    if lo is None:
+        return pd.DataFrame(columns=['bin', 'MITRE Tactic', 'n', 'chains'])
+    lo, hi = pd.Timestamp(lo), pd.Timestamp(hi)
+    width = max((hi - lo) / DENSITY_BINS, pd.Timedelta(minutes=1))
+
+    # seconds since lo are never negative inside the window, so integer
+    # division is a floor on every dialect
+    offset = db.cast(db.extract('epoch', AttackChain.ts) - int(lo.timestamp()), db.Integer)
+    bucket = offset // int(width.total_seconds())
+    q = (db.select(bucket.label('b'),
+                   AttackChain.mitre_tactic.label('MITRE Tactic'),
+                   db.func.count().label('n'),
+                   db.func.count(AttackChain.attack_chain_name.distinct()).label('chains'))
+           .where(AttackChain.ts.between(lo.to_pydatetime(), hi.to_pydatetime()), *where)
+           .group_by(bucket, AttackChain.mitre_tactic))
+    counts = pd.read_sql(q, con=db.engine)
+    counts['bin'] = lo + (counts.pop('b') + .5) * width
+    return counts
+
+def view_overlay(fig_normal, fig_all):
+    """What the all-tactics view adds on top of the normal one: the dummy
+    trace pinning every tactic row, the missing-tactic bands and the full
+    category array."""
+    n_shapes = len(fig_normal.layout.shapes)
+    return {
+        'data': [tr.to_plotly_json() for tr in fig_all.data[len(fig_normal.data):]],
+        'shapes': [sh.to_plotly_json() for sh in fig_all.layout.shapes[n_shapes:]],
+        'yaxis': {'categoryorder': 'array',
+                  'categoryarray': list(fig_all.layout.yaxis.categoryarray)},
+    }
 
+def fig_store_payload(figs):
+    """Turn a chainsmoker() result into (fig-store data, fig-meta data).
+
+    The store holds the normal figure once plus the overlay that turns it into
+    the all-tactics view (assets/view.js composes it), not two full copies.
+    """
+    fig_normal, fig_all, missing, visible, all_tacs = figs
+    store = {'figure': fig_normal.to_dict(), 'overlay': view_overlay(fig_normal, fig_all)}
+    # no per-chain traces to patch in single-trace mode → always rebuild
+    chains = [] if SINGLE_TRACE else [tr.name for tr in fig_normal.data]
+    meta = {'chains': chains, 'visible': visible, 'all_tacs': all_tacs,
+            'windowed': False}
+    return store, meta
+
+
+# ─── Filters ─────────────────────────────────────────────────────────────────
+# fig-filter: {"chains": [...], "operators": [...], "tactics": [...],
+# "start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}, every key optional. The graph
+# is built from the matching rows only, so an analyst looking at one
+# engagement pays for that engagement, not the whole history.
+FILTER_COLUMNS = {
+    "chains":    AttackChain.attack_chain_name,
+    "operators": AttackChain.operator,
+    "tactics":   AttackChain.mitre_tactic,
+}
 
-fig_normal, fig_all, missing_t, visible_t, all_t = chainsmoker_db()
+def normalize_filter(raw):
+    """Canonical fig-filter: empty keys dropped, lists sorted, dates checked.
+
+    raw: the fig-filter store or the /api/figure query args as a dict of
+    lists. Raises ValueError on a date that won't parse.
+    """
+    flt = {}
+    for key in FILTER_COLUMNS:
+        values = raw.get(key) or []
+        values = sorted({v for v in ([values] if isinstance(values, str) else values) if v})
+        if values:
+            flt[key] = values
+    for key in ("start", "end"):
+        value = raw.get(key)
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if value:
+            flt[key] = pd.Timestamp(value).date().isoformat()
+    return flt
+
+def filter_key(flt):
+    """Cache key for a normalised filter; "" is the unfiltered graph."""
+    return json.dumps(flt, sort_keys=True) if flt else ""
+
+def filter_clauses(flt):
+    """WHERE clauses for a normalised filter. Values are bound parameters."""
+    where = [FILTER_COLUMNS[key].in_(values)
+             for key, values in flt.items() if key in FILTER_COLUMNS]
+    if "start" in flt:
+        where.append(AttackChain.ts >= pd.Timestamp(flt["start"]).to_pydatetime())
+    if "end" in flt:
+        # the end date is inclusive
+        end = pd.Timestamp(flt["end"]) + pd.Timedelta(days=1)
+        where.append(AttackChain.ts < end.to_pydatetime())
+    return where
+
+# filter panel options for the last data version seen; home renders at an
+# unchanged version skip the GROUP BY and DISTINCT scans
+_options_cache = {'version': None, 'options': None}
+_options_cache_lock = threading.Lock()
+
+def filter_options():
+    """Dropdown options for the filter panel: every chain (with its node
+    count), operator and tactic in the table."""
+    version = chain_version()
+    with _options_cache_lock:
+        if _options_cache['version'] == version:
+            return _options_cache['options']
+
+    operators = db.session.execute(
+        db.select(AttackChain.operator).where(AttackChain.operator.is_not(None))
+          .distinct().order_by(AttackChain.operator)).scalars()
+    tactics = present_tactics()
+    options = {
+        "chains": chain_options(),
+        "operators": [{"label": op, "value": op} for op in operators],
+        "tactics": [{"label": t, "value": t} for t in MITRE_TACTICS if t in tactics],
+    }
+    with _options_cache_lock:
+        _options_cache.update(version=version, options=options)
+    return options
+
+
+# ─── Figure cache ────────────────────────────────────────────────────────────
+# One build per data version and filter per process, the last FIG_CACHE_VIEWS
+# filters kept. Page loads and rebuilding callbacks at an unchanged version
+# only pay for the single-row version lookup. Callbacks hand the browser just
+# the version (fig-token); it fetches the figure itself from
+# /api/figure/<version>?<filter>, serialised once per version and filter.
+FIG_CACHE_VIEWS = 16
+_fig_cache = {'version': None, 'views': OrderedDict()}
+_fig_cache_lock = threading.Lock()
+
+def chain_version():
+    return db.session.execute(
+        db.select(ChainVersion.version).where(ChainVersion.id == 1)
+    ).scalar_one()
+
+def get_figures(flt=None):
+    """Return the chainsmoker() tuple for the current data version."""
+    return _refresh_fig_cache(flt)['figs']
+
+def current_fig_token():
+    """fig-token data for the current data version. The figures are built
+    when /api/figure asks for them, for whatever filter the tab has set."""
+    return chain_version()
+
+def fig_payload(version, flt=None):
+    """JSON body of /api/figure/<version>: fig-store and fig-meta data.
+
+    None when `version` is no longer the current one.
+    """
+    view = _refresh_fig_cache(flt)
+    if view['version'] != version:
+        return None
+    with view['lock']:
+        if view['payload'] is None:
+            store, meta = view['store']
+            view['payload'] = to_json_plotly({'store': store, 'meta': meta})
+        return view['payload']
+
+def _refresh_fig_cache(flt=None):
+    flt = flt or {}
+    key = filter_key(flt)
+    # read the version *before* the table so a concurrent write can only make
+    # the cached figures newer than their label, never older
+    version = chain_version()
+    # the global lock only guards the dict; each view is built under its own
+    # lock, so one slow build doesn't hold up every other filter, and
+    # concurrent requests for the same view wait for a single build
+    with _fig_cache_lock:
+        if _fig_cache['version'] != version:
+            _fig_cache.update(version=version, views=OrderedDict())
+        views = _fig_cache['views']
+        if key not in views:
+            views[key] = {'version': version, 'lock': threading.Lock(),
+                          'figs': None, 'payload': None}
+            while len(views) > FIG_CACHE_VIEWS:
+                views.popitem(last=False)
+        views.move_to_end(key)
+        view = views[key]
+    with view['lock']:
+        if view['figs'] is None:    # first request, or the last build failed
+            view.update(build_view(version, flt))
+    return view
+
+def build_view(version, flt):
+    """Figures, fig-store and fig-meta for the rows matching flt."""
+    where = filter_clauses(flt)
+    present = present_tactics(*where)
+    windowed = count_nodes(*where) > WINDOW_MAX_POINTS
+    if windowed:
+        lo, hi = db.session.execute(
+            db.select(db.func.min(AttackChain.ts), db.func.max(AttackChain.ts))
+              .where(*where)).one()
+        figs = density_figures(density_counts(lo, hi, *where), present, lo)
+    else:
+        figs = chainsmoker(load_chain_rows(*where), present)
+    store, meta = fig_store_payload(figs)
+    if windowed:
+        # the store holds the overview; window_graph draws the detail
+        meta.update(chains=[], windowed=True)
+    # patches assume the whole table is on screen; filtered views refetch.
+    # filter goes back up with window-range, so the window matches the store
+    meta.update(version=version, filtered=bool(flt), filter=flt)
+    return {'present': present, 'figs': figs, 'store': (store, meta), 'payload': None}
+
+def window_figures(x_range=None, flt=None):
+    """(fig_normal, fig_all, ...) for the nodes inside x_range, bounded in size.
+
+    Few enough nodes in the window → the regular per-chain figures for just
+    those rows; otherwise a density overview of the window.
+    """
+    view = _refresh_fig_cache(flt)
+    if x_range is None:
+        return view['figs']
+
+    lo, hi = x_range
+    where = [AttackChain.ts.between(lo.to_pydatetime(), hi.to_pydatetime()),
+             *filter_clauses(flt or {})]
+    if count_nodes(*where) <= WINDOW_MAX_POINTS:
+        return chainsmoker(load_chain_rows(*where), view['present'])
+    return density_figures(density_counts(lo, hi, *filter_clauses(flt or {})),
+                           view['present'], lo)
+
+
+# ─── Incremental fig-store updates ───────────────────────────────────────────
+# Adding or deleting a single node only touches one trace, so instead of
+# re-reading the table and re-serialising the figure we hand Dash a Patch
+# that edits that trace in place. The all-tactics view is composed from the
+# same traces in the browser, so it picks the edit up too. A None return
+# means the chain or tactic set changed → full rebuild. The trace type
+# (Scatter/Scattergl) is fixed when the figure is built; a patched figure
+# keeps it until the next rebuild, even if it drifts across WEBGL_THRESHOLD.
+
+# assets/live.js applies the same edits to other tabs' fig-store from the
+# live event; keep the two in step.
+
+def patch_node_added(meta, evt):
+    """Patch for a node_added event (node_added_event)."""
+    if not meta or meta.get('filtered') or 'pos' not in evt:
+        return None
+    if evt['chain'] not in meta['chains'] or evt['tactic'] not in meta['visible']:
+        return None
+
+    idx = meta['chains'].index(evt['chain'])
+    patch = Patch()
+    trace = patch['figure']['data'][idx]
+    trace['x'].insert(evt['pos'], evt['x'])
+    trace['y'].insert(evt['pos'], evt['tactic'])
+    trace['customdata'].insert(evt['pos'], evt['row_id'])
+    trace['text'].insert(evt['pos'], evt['text'])
+    # marker colours are just 0..n-1 along the chain
+    trace['marker']['color'].append(evt['n'] - 1)
+    return patch
+
+def patch_node_deleted(meta, evt):
+    """Patch for a node_deleted event."""
+    if not meta or meta.get('filtered'):
+        return None
+    if evt['chain'] not in meta['chains'] or evt['n_before'] <= 1:
+        return None
+    if not evt['tactic_left']:
+        return None     # last node of this tactic → it moves to "missing"
+
+    idx = meta['chains'].index(evt['chain'])
+    patch = Patch()
+    trace = patch['figure']['data'][idx]
+    for key in ('x', 'y', 'customdata', 'text'):
+        del trace[key][evt['pos']]
+    trace['marker']['color'].remove(evt['n_before'] - 1)
+    return patch
+
+
+# build once at start-up so the first page load hits a warm cache
+with server.app_context():
+    get_figures()
 
 
 
@@ -660,12 +1838,26 @@ node_form = html.Div(
 # ─────────────────────────────────────────────────────────────────────────────
 
 def serve_layout():
-    fig_normal, fig_all, missing_t, visible_t, all_t = chainsmoker_db()
     layout = html.Div([
-        dcc.Store(id='fig-store', data={'normal': fig_normal.to_dict(),
-                                        'all':    fig_all.to_dict()}),
+        # fig-store / fig-meta are filled by assets/view.js from fig-token
+        dcc.Store(id='fig-token', data=current_fig_token()),
+        dcc.Store(id='fig-store'),
+        dcc.Store(id='fig-meta'),
+        dcc.Store(id='fig-filter'),
+        # big tables only: the zoomed window's figures, shaped like fig-store
+        dcc.Store(id='window-range'),
+        dcc.Store(id='window-store'),
         dcc.Store(id='zoom-state', storage_type='memory'),
         dcc.Store(id='internal-counter', data=0, storage_type='memory'),
+        dcc.Store(id='pull-job'),
+        dcc.Store(id='pull-status'),
+        dcc.Interval(id='pull-poll', interval=1000, disabled=True),
+        dcc.Interval(id='version-poll', interval=REFRESH_INTERVAL_MS, disabled=True),
+        dcc.Store(id='data-version'),
+        dcc.Store(id='client-id', data=secrets.token_hex(8)),
+        dcc.Store(id='live-event'),
+        dcc.Store(id='shown-node'),     # row_id in the notes panel, for live.js
+        dcc.Store(id='notes-refresh'),
         dcc.Location(id='url', refresh=True),
         
 
@@ -744,62 +1936,100 @@ def serve_layout():
 app.layout = serve_layout
 app.title = 'Chainsmoker'
 
-graph_view = [
-    toggle_btn,
-    dcc.Graph(
-        id='attack-chain-graph',
-        figure=fig_all,
-        config=PLOT_CONFIG,
-        className='fig',
-        style={'margin':'12px'}
-    ),
-
-    html.Div(
+def filter_dropdown(id_, options, placeholder):
+    return dcc.Dropdown(
+        id=id_,
+        options=options,
+        multi=True,
+        placeholder=placeholder,
+        persistence=True,
+        persistence_type='session',
+        className='dark-dropdown',
+        style={'color': '#1a1a1a', 'minWidth': '220px', 'flex': '1'}
+    )
+
+def filter_panel():
+    """Chain / operator / tactic / date filter. ui.collectFilter turns it into
+    fig-filter, which view.loadFigure sends along to /api/figure."""
+    opts = filter_options()
+    return html.Div(
         [
-            dbc.Button("📝 Add Note", id="btn-toggle-notes", n_clicks=0,
-                       className="fancy-button"),
-            dbc.Button("➕ Add Node", id="btn-toggle-node", n_clicks=0,
-                       className="fancy-button", style={'marginLeft':'8px'}),
-            dbc.Button("🗑️ Delete Node", id="btn-delete-node", n_clicks=0,
-                       className="fancy-button",
-                       style={'marginLeft':'8px'},
-                       disabled=True),
-        ], style={'margin':'12px 12px 4px'}
-    ),
-
-    html.Div(id="note-alert", style={'margin':'12px'}),  
-    html.Div(id="delete-fdbk", style={'margin':'12px'}),
-
-    html.Pre('Click on a node to view comments', id='click-data',
-        className='fancy-border', style={'margin':'12px'}),
+            filter_dropdown('filter-chains', opts['chains'], "All attack chains"),
+            filter_dropdown('filter-operators', opts['operators'], "All operators"),
+            filter_dropdown('filter-tactics', opts['tactics'], "All tactics"),
+            dcc.DatePickerRange(
+                id='filter-dates',
+                clearable=True,
+                display_format='YYYY-MM-DD',
+                start_date_placeholder_text='From',
+                end_date_placeholder_text='To',
+                persistence=True,
+                persistence_type='session'
+            ),
+        ],
+        style={'display': 'flex', 'flexWrap': 'wrap', 'gap': '8px',
+               'alignItems': 'center', 'margin': '12px 12px 4px'}
+    )
 
-    
+def graph_view():
+    # empty axes until view.updateGraph draws fig-store into them
+    return [
+        filter_panel(),
+        toggle_btn,
+        dcc.Graph(
+            id='attack-chain-graph',
+            figure=go.Figure(layout=build_base_layout()),
+            config=PLOT_CONFIG,
+            className='fig',
+            style={'margin':'12px'}
+        ),
 
-    # collapse for notes
-    dbc.Collapse(
         html.Div(
             [
-                form,
-            ],
-            className='three columns'
+                dbc.Button("📝 Add Note", id="btn-toggle-notes", n_clicks=0,
+                           className="fancy-button"),
+                dbc.Button("➕ Add Node", id="btn-toggle-node", n_clicks=0,
+                           className="fancy-button", style={'marginLeft':'8px'}),
+                dbc.Button("🗑️ Delete Node", id="btn-delete-node", n_clicks=0,
+                           className="fancy-button",
+                           style={'marginLeft':'8px'},
+                           disabled=True),
+            ], style={'margin':'12px 12px 4px'}
         ),
-        id='collapse-notes',
-        is_open=False
-    ),
 
-    # collapse for node form
-    dbc.Collapse(
-        html.Div(
-            [
-                node_form,
-                html.Pre(id='save-fdbk-node', style={'marginTop':'4px'})
-            ],
-            className='three columns'
+        html.Div(id="note-alert", style={'margin':'12px'}),  
+        html.Div(id="delete-fdbk", style={'margin':'12px'}),
+
+        html.Pre('Click on a node to view comments', id='click-data',
+            className='fancy-border', style={'margin':'12px'}),
+
+    
+
+        # collapse for notes
+        dbc.Collapse(
+            html.Div(
+                [
+                    form,
+                ],
+                className='three columns'
+            ),
+            id='collapse-notes',
+            is_open=False
         ),
-        id='collapse-node',
-        is_open=False
-    )
-]
+
+        # collapse for node form
+        dbc.Collapse(
+            html.Div(
+                [
+                    node_form,
+                    html.Pre(id='save-fdbk-node', style={'marginTop':'4px'})
+                ],
+                className='three columns'
+            ),
+            id='collapse-node',
+            is_open=False
+        )
+    ]
 
 settings_view = dbc.Container([
     html.H2("⚙️ Settings"),
@@ -819,7 +2049,7 @@ settings_view = dbc.Container([
 )
 def display_page(pathname):
     if pathname in ["/", ""]:
-        return graph_view
+        return graph_view()
     elif pathname == "/settings":
         return settings_view
     else:
@@ -827,97 +2057,102 @@ def display_page(pathname):
         return html.Div("404 - Page not found", style={"padding": "2rem"})
 
 
-@callback(Output('zoom-state', 'data', allow_duplicate=True),
-          Input('attack-chain-graph', 'relayoutData'),
-          prevent_initial_call=True)
-def store_zoom(relayout):
-    if not relayout or 'xaxis.autorange' in relayout or 'yaxis.autorange' in relayout:
-        return None
-    z = {}
-    for ax in ('xaxis', 'yaxis'):
-        lo, hi = f'{ax}.range[0]', f'{ax}.range[1]'
-        if lo in relayout and hi in relayout:
-            z[lo] = relayout[lo]
-            z[hi] = relayout[hi]
-    return z or None
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="storeZoom"),
+    Output('zoom-state', 'data', allow_duplicate=True),
+    Input('attack-chain-graph', 'relayoutData'),
+    prevent_initial_call=True
+)
 
-@callback(
+# assets/view.js: fetches /api/figure/<fig-token> into fig-store and fig-meta
+# together, so fig-meta's version always describes what fig-store holds and
+# the patching callbacks can trust it. Figures only ever travel over that
+# GET; callbacks send and receive the token.
+app.clientside_callback(
+    ClientsideFunction(namespace="view", function_name="loadFigure"),
+    Output('fig-store',             'data'),
+    Output('fig-meta',              'data'),
+    Input('fig-token',              'data'),
+    Input('fig-filter',             'data'),
+)
+
+# assets/ui.js: filter panel → fig-filter (unchanged filters don't refetch);
+# a new filter also drops the zoom box, which belonged to the old subset
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="collectFilter"),
+    Output('fig-filter',            'data'),
+    Output('zoom-state',            'data', allow_duplicate=True),
+    Input('filter-chains',          'value'),
+    Input('filter-operators',       'value'),
+    Input('filter-tactics',         'value'),
+    Input('filter-dates',           'start_date'),
+    Input('filter-dates',           'end_date'),
+    State('fig-filter',             'data'),
+    prevent_initial_call='initial_duplicate'
+)
+
+# assets/view.js: picks the normal/all figure out of fig-store (or, zoomed
+# into a windowed table, window-store), flips the view and remaps the zoom box
+# between the two category axes (flag in internal-counter: 0 = all-tactics,
+# 1 = normal view). Toggling never touches the server. Runs on mount too, so
+# returning to the page redraws from the stores.
+app.clientside_callback(
+    ClientsideFunction(namespace="view", function_name="updateGraph"),
     Output('attack-chain-graph', 'figure', allow_duplicate=True),
     Output('toggle-list-all-btn', 'children'),
     Output('internal-counter', 'data'),
+    Output('zoom-state',            'data', allow_duplicate=True),
     Input('fig-store',              'data'),        # refresh (e.g. new node)
+    Input('window-store',           'data'),        # zoomed window (big tables)
     Input('toggle-list-all-btn',    'n_clicks'),    # user toggles
     State('zoom-state',             'data'),        # last zoom
     State('internal-counter',       'data'),        # current view flag
-    prevent_initial_call=True
+    State('fig-meta',               'data'),
+    prevent_initial_call='initial_duplicate'
 )
-def update_graph(figs_dict, n_clicks, zoom, flag):
-    """
-    flag (internal-counter): 0 = all-tactics, 1 = normal view
-    """
-    # Determine desired view after this callback
-    if dash.callback_context.triggered_id == 'toggle-list-all-btn':
-        flag = 1 - flag                                   # flip view
-
-    view_key = 'normal' if flag else 'all'
-    fig = go.Figure(figs_dict[view_key])
-
-    # --- apply special ceil/floor y-axis maths when switching views
-    if zoom and dash.callback_context.triggered_id == 'toggle-list-all-btn':
-        zx0, zx1 = zoom['xaxis.range[0]'], zoom['xaxis.range[1]']
-        zy0, zy1 = zoom['yaxis.range[0]'], zoom['yaxis.range[1]']
 
-        if flag:  # we are moving all-→normal (visible_t list is shorter)
-            raw_y0 = math.ceil(zy0)
-            raw_y1 = math.floor(zy1)
-
-            raw_y0 = clamp(raw_y0, 0, len(all_t)     - 1)
-            raw_y1 = clamp(raw_y1, 0, len(all_t)     - 1)
-
-            y0_idx = visible_t.index(all_t[raw_y0])
-            y1_idx = visible_t.index(all_t[raw_y1])
-
-            fig.update_layout(
-                xaxis=dict(range=[zx0, zx1]),
-                yaxis=dict(range=[y0_idx - (zy0 - math.floor(zy0)),
-                                  y1_idx + (zy1 - math.floor(zy1))])
-            )
-
-        else:     # moving normal-→all (longer y-axis)
-            raw_y0 = math.ceil(zy0)
-            raw_y1 = math.floor(zy1)
-
-            raw_y0 = clamp(raw_y0, 0, len(visible_t) - 1)
-            raw_y1 = clamp(raw_y1, 0, len(visible_t) - 1)
-
-            y0_idx = all_t.index(visible_t[raw_y0])
-            y1_idx = all_t.index(visible_t[raw_y1])
-            fig.update_layout(
-                xaxis=dict(range=[zx0, zx1]),
-                yaxis=dict(range=[y0_idx - (zy0 - math.floor(zy0)),
-                                  y1_idx + (zy1 - math.floor(zy1))])
-            )
-    elif zoom:   # no view change – just reuse stored ranges
-        fig.update_layout(
-            xaxis=dict(range=[zoom['xaxis.range[0]'], zoom['xaxis.range[1]']]),
-            yaxis=dict(range=[zoom['yaxis.range[0]'], zoom['yaxis.range[1]']])
-        )
+# assets/view.js: zoom-state → window-range, and only on windowed tables, so
+# small ones never send a request on zoom. A zoom that keeps the time range
+# (y-only, view toggles) doesn't either.
+app.clientside_callback(
+    ClientsideFunction(namespace="view", function_name="windowRange"),
+    Output('window-range',          'data'),
+    Output('window-store',          'data', allow_duplicate=True),
+    Input('zoom-state',             'data'),
+    Input('fig-meta',               'data'),
+    State('window-range',           'data'),
+    State('window-store',           'data'),
+    prevent_initial_call=True
+)
 
-    btn_label = 'Hide Missing Tactics' if not flag else 'Show Missing Tactics'
-    return fig, btn_label, flag
+@callback(
+    Output('window-store', 'data'),
+    Input('window-range',  'data'),
+    prevent_initial_call=True
+)
+def window_graph(req):
+    """Big tables only: the zoomed time window's figures from the server
+    cache, in fig-store's shape so the browser composes and toggles them."""
+    if not req:
+        raise dash.exceptions.PreventUpdate
+    x_range = tuple(pd.Timestamp(x) for x in req['range'])
+    store, _ = fig_store_payload(window_figures(x_range, normalize_filter(req['filter'])))
+    return dict(store, version=req['version'], filter=req['filter'])
 
 @callback(
     [Output('save-fdbk',    'children'),
      Output('click-data',   'children')],
     [Input('save-button',    'n_clicks'),
-     Input('attack-chain-graph', 'clickData')],
+     Input('attack-chain-graph', 'clickData'),
+     Input('notes-refresh',  'data')],
     [State('mitre-dropdown', 'value'),
      State('mpnet-date',     'value'),
      State('name-input',     'value'),
-     State('note-input',     'value')],
+     State('note-input',     'value'),
+     State('client-id',      'data')],
     prevent_initial_call=True
 )
-def notes_clickdata(n_clicks, clickData, tactic, date, name, note_input):
+def notes_clickdata(n_clicks, clickData, refresh, tactic, date, name, note_input, client_id):
     ctx = dash.callback_context
     if not ctx.triggered:
         raise dash.exceptions.PreventUpdate
@@ -925,6 +2160,13 @@ def notes_clickdata(n_clicks, clickData, tactic, date, name, note_input):
     triggered_id = ctx.triggered_id
     feedback = ""
 
+    # --- Someone else commented on the node we're showing: redraw the panel ---
+    # (assets/live.js only writes notes-refresh for the node on display)
+    if triggered_id == "notes-refresh":
+        if not refresh or hash_node(clickData) != refresh["node_id"]:
+            raise dash.exceptions.PreventUpdate
+        feedback = dash.no_update
+
     # --- Save note if Save button triggered ---
     if triggered_id == "save-button":
         if not clickData:
@@ -945,6 +2187,7 @@ def notes_clickdata(n_clicks, clickData, tactic, date, name, note_input):
             note=note_input,
         )
         db.session.add(comment)
+        set_live_origin(client_id)
         db.session.commit()
         feedback = "✅ Notes Saved!"
 
@@ -953,11 +2196,7 @@ def notes_clickdata(n_clicks, clickData, tactic, date, name, note_input):
         return feedback or "⚠️ No node selected.", dash.no_update
 
     node_id = hash_node(clickData)
-    comments = NodeComment.query.filter_by(node_id=node_id).order_by(NodeComment.created).all()
-    notes = [
-        {"operator": c.operator, "tactic": c.tactic, "date": c.date, "note": c.note}
-        for c in comments
-    ]
+    notes = node_comments(node_id)
 
     raw_text = clickData["points"][0]["text"]
     hover_txt = (h.unescape(
@@ -981,17 +2220,16 @@ def notes_clickdata(n_clicks, clickData, tactic, date, name, note_input):
     return feedback, [table_div]
 
 
-@callback(
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="notesHide"),
     Output('notes-hide', 'style'),
     Input('show-notes-btn-1', 'n_clicks')
 )
-def notes_hide(n_clicks):
-    return {'display': 'block' if n_clicks % 2 == 1 else 'none'}
 
 @callback(
     Output('save-fdbk-node',    'children'),
-    Output('attack-chain-graph', 'figure'),
     Output('fig-store',          'data', allow_duplicate=True),
+    Output('fig-token',          'data', allow_duplicate=True),
     Input('save-button-node',    'n_clicks'),
     State('mpnet-date-input-node','value'),
     State('mitre-dropdown-node', 'value'),
@@ -1001,9 +2239,11 @@ def notes_hide(n_clicks):
     State('notes-input-node',    'value'),
     State('name-input-node',     'value'),
     State('atk-chn-input-node',  'value'),
+    State('fig-meta',            'data'),
+    State('client-id',           'data'),
     prevent_initial_call=True
 )
-def save_node(n_clicks, date, tactic, src, dst, details, notes, name, chain):
+def save_node(n_clicks, date, tactic, src, dst, details, notes, name, chain, meta, client_id):
     if not n_clicks:
         raise dash.exceptions.PreventUpdate
 
@@ -1019,34 +2259,34 @@ def save_node(n_clicks, date, tactic, src, dst, details, notes, name, chain):
         attack_chain_name = chain
     )
     db.session.add(new_chain)
+    set_live_origin(client_id)
+    db.session.flush()
+    # the flush hook worked out the trace edit for the live event; reuse it
+    evt = next(e for e in db.session.info["live_events"] if e["type"] == "node_added")
     db.session.commit()
 
-    # 2) Rebuild both figures and the store
-    fig_normal, fig_all, *_ = chainsmoker_db()
-    fig_store = {
-        'normal': fig_normal.to_dict(),
-        'all':    fig_all.to_dict()
-    }
-
+    # 2) Patch the node into its trace, or rebuild if it's a new chain/tactic
     feedback = dbc.Alert('✅ Node Saved!', style={'color': 'success'}, duration=3000)
 
-    return feedback, fig_normal, fig_store
+    patch = patch_node_added(meta, evt)
+    if patch is not None:
+        return feedback, patch, dash.no_update
 
+    return feedback, dash.no_update, current_fig_token()
 
-@callback(
+
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="updateLabel"),
     [Output("api-url-label", "children"),
     Output("api-username", "placeholder")],
     Input("api-type", "value")
 )
-def update_label(api_type):
-    if api_type == "kb":
-        return "Kibana API Endpoint", 'elastic'
-    return "Base URL", 'onion@fake.local'
 
 @callback(Output("tabs-content", "children"),
           Input("settings-tabs", "active_tab"))
 def render_settings_tab(active_tab):
     if active_tab == "tab-api":
+        api_options, api_on = api_config_options()
         return html.Div([
             # API SECTION
             html.Div([
@@ -1094,11 +2334,14 @@ def render_settings_tab(active_tab):
             # ———————————————————————————————————————————
             html.Div([
                 dbc.Label("Password", html_for="api-password"),
+                # never pre-filled: the session only holds the encrypted
+                # secret, and a blank field keeps the saved one
                 dbc.Input(
                     id="api-password",
                     type="password",
-                    placeholder="••••••••",
-                    value=session.get("api_password", ""),
+                    placeholder=("Saved (leave blank to keep)" if session.get("api_password")
+                                 else "••••••••"),
+                    value="",
                 ),
             ], className="mb-3"),
 
@@ -1110,8 +2353,9 @@ def render_settings_tab(active_tab):
                 dbc.Input(
                     id="api-key",
                     type="text",
-                    placeholder="Base64 Format (or leave blank if not using)",
-                    value=session.get("api_key", ""),
+                    placeholder=("Saved (leave blank to keep)" if session.get("api_key")
+                                 else "Base64 Format (or leave blank if not using)"),
+                    value="",
                 ),
             ], className="mb-3"),
                 html.Div([
@@ -1126,10 +2370,37 @@ def render_settings_tab(active_tab):
                 ], className="button-row"),
                 
                 html.Span(id="save-api-feedback", className="ms-3"),
-                html.Span(id="api-btn-fdbk", className="ms-3")
+                # pattern id: render_pull_status may fire on any page
+                html.Span(id={"type": "pull-feedback", "index": 0}, className="ms-3")
     
             ], className="setting-section api-section"),
 
+            # saved configs: what the scheduler pulls every CHAINSMOKER_SYNC_INTERVAL
+            html.Div([
+                html.H3("🕒 Scheduled Sync", className="section-title"),
+                html.P("Switch a saved config on to pull it in the background, off to "
+                       "stop, or delete it.", className="text-muted"),
+                dbc.Checklist(
+                    id="api-configs",
+                    options=api_options,
+                    value=api_on,
+                    switch=True,
+                    className="mb-3"
+                ),
+                dcc.Dropdown(
+                    id="api-config-delete",
+                    options=api_options,
+                    placeholder="Saved config to delete",
+                    className="dark-dropdown",
+                    style={"color": "#1a1a1a"}
+                ),
+                html.Button("🗑️ Delete Config",
+                            id="btn-delete-api-config",
+                            className="fancy-button",
+                            style={"marginTop": "10px"}),
+                html.Span(id="api-configs-feedback", className="ms-3"),
+            ], className="setting-section api-section"),
+
         ])
 
     elif active_tab == "tab-other":
@@ -1145,19 +2416,31 @@ def render_settings_tab(active_tab):
                         dbc.CardBody([
                             html.H5("Export", className="card-title"),
                             html.P(
-                                "Download the current database as a JSON file.",
+                                "Download the current database as JSON, NDJSON or Parquet.",
                                 className="card-text"
                             ),
-                            # Download component (invisible)
-                            dcc.Download(id="download-db"),
+                            dbc.RadioItems(
+                                id="export-format",
+                                options=[
+                                    {"label": "JSON", "value": "json"},
+                                    {"label": "NDJSON (one row per line)", "value": "ndjson"},
+                                    {"label": "Parquet (zip, smallest)", "value": "parquet"},
+                                ],
+                                value="json",
+                                className="mb-2"
+                            ),
+                            dbc.Checkbox(id="export-gzip", label="gzip", value=False,
+                                         className="mb-2"),
 
+                            # plain link: /api/export streams the file
                             dbc.Button(
                                 "⬇️ Export Database",
                                 id="export-btn",
+                                href="/api/export",
+                                external_link=True,
                                 color="primary",
                                 className="w-100"
                             ),
-                            html.Div(id="export-feedback", className="mt-3"),
                         ]),
                         className="shadow-sm mb-4"
                     ),
@@ -1171,7 +2454,8 @@ def render_settings_tab(active_tab):
                         dbc.CardBody([
                             html.H5("Import", className="card-title"),
                             html.P(
-                                "Upload a previously exported JSON file to restore or merge data. "
+                                "Upload a previously exported JSON, NDJSON (gzipped is fine) or Parquet file "
+                                "to restore or merge data. "
                                 "Duplicates will be skipped automatically.",
                                 className="card-text"
                             ),
@@ -1211,6 +2495,23 @@ def render_settings_tab(active_tab):
                                 placeholder="Type 'saturn burger' to confirm",
                                 className="mb-2"
                             ),
+                            # scoped alternative: drop whole engagements only
+                            dcc.Dropdown(
+                                id="purge-chains",
+                                options=chain_options(),
+                                multi=True,
+                                placeholder="Attack chain(s) to purge",
+                                className="dark-dropdown",
+                                style={"color": "#1a1a1a"}
+                            ),
+                            dbc.Button(
+                                "🔥 Purge Selected Chains",
+                                id="btn-purge-chains",
+                                color="danger",
+                                disabled=True,
+                                className="fancy-button",
+                                style={"marginTop": "10px"}
+                            ),
                             dbc.Button(
                                 "💀 Wipe Entire Database 💀",
                                 id="btn-wipe-db",
@@ -1240,6 +2541,9 @@ def render_settings_tab(active_tab):
 
 @callback(
     Output("save-api-feedback", "children"),
+    Output("api-configs",   "options", allow_duplicate=True),
+    Output("api-configs",   "value", allow_duplicate=True),
+    Output("api-config-delete", "options", allow_duplicate=True),
     Input("btn-save-api",   "n_clicks"),
     State("api-type",       "value"),
     State("api-url",        "value"),
@@ -1249,31 +2553,105 @@ def render_settings_tab(active_tab):
     prevent_initial_call=True
 )
 def save_api_settings(n, api_type, url, user, pwd, key):
-    # encrypt the secrets
+    no_change = dash.no_update, dash.no_update, dash.no_update
+    url = (url or "").strip().rstrip("/")
+    user = (user or "").strip()
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return dbc.Alert("❌ Enter the base URL, e.g. https://10.0.0.5", color="danger"), *no_change
+
+    cfg = ApiConfig.query.filter_by(api_type=api_type, base_url=url, username=user).first()
+    # encrypt the secrets; blank fields keep what this config (or, for a new
+    # URL, the form's current settings) already had
+    same_user = session.get("api_username", "") == user
+    pwd_enc = (crypto.encrypt_secret(pwd) if pwd
+               else cfg.password_enc if cfg and cfg.password_enc
+               else session.get("api_password", "") if same_user else "")
+    key_enc = (crypto.encrypt_secret(key) if key
+               else cfg.api_key_enc if cfg and cfg.api_key_enc
+               else session.get("api_key", ""))
+    if not key_enc and not (user and pwd_enc):
+        return dbc.Alert("❌ Enter a username and password, or an API key.", color="danger"), *no_change
+
     session["api_type"]     = api_type
     session["api_url"]      = url
     session["api_username"] = user
-    session["api_password"] = crypto.encrypt_secret(pwd)
-    if key:
-        session["api_key"] = crypto.encrypt_secret(key)
+    session["api_password"] = pwd_enc
+    if key_enc:
+        session["api_key"] = key_enc
     else:
         session.pop("api_key", None)
-    return dbc.Alert("✅ Saved!", color="success", duration=2000)
+
+    # persist for the sync scheduler, which has no browser session to read
+    try:
+        if cfg is None:
+            cfg = ApiConfig(api_type=api_type, base_url=url, username=user, auto_sync=False)
+            db.session.add(cfg)
+        cfg.password_enc = pwd_enc or None
+        cfg.api_key_enc  = key_enc or None
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return dbc.Alert(f"⚠️ Saved for this session only: {e}", color="warning"), *no_change
+    options, on = api_config_options()
+    return dbc.Alert("✅ Saved!", color="success", duration=2000), options, on, options
 
 @callback(
-    Output("api-btn-fdbk",    "children"),
-    Output("fig-store",       "data", allow_duplicate=True),
+    Output("api-configs-feedback", "children"),
+    Input("api-configs",    "value"),
+    prevent_initial_call=True
+)
+def set_auto_sync(enabled):
+    enabled = set(enabled or [])
+    changed = 0
+    for cfg in ApiConfig.query.all():
+        if cfg.auto_sync != (cfg.id in enabled):
+            cfg.auto_sync = cfg.id in enabled
+            changed += 1
+    db.session.commit()
+    if not changed:
+        raise dash.exceptions.PreventUpdate
+    return dbc.Alert(f"✅ Scheduled sync on for {len(enabled)} config(s).",
+                     color="success", duration=2000)
+
+@callback(
+    Output("api-configs-feedback", "children", allow_duplicate=True),
+    Output("api-configs",   "options", allow_duplicate=True),
+    Output("api-configs",   "value", allow_duplicate=True),
+    Output("api-config-delete", "options", allow_duplicate=True),
+    Output("api-config-delete", "value"),
+    Input("btn-delete-api-config", "n_clicks"),
+    State("api-config-delete", "value"),
+    prevent_initial_call=True
+)
+def delete_api_config(n_clicks, config_id):
+    if not n_clicks or config_id is None:
+        raise dash.exceptions.PreventUpdate
+    cfg = db.session.get(ApiConfig, config_id)
+    if cfg is not None:
+        db.session.delete(cfg)
+        db.session.commit()
+    options, on = api_config_options()
+    # pulled nodes and the config's watermark stay; saving it again resumes
+    return (dbc.Alert("🗑️ Config deleted; it won't be synced again.",
+                      color="warning", duration=3000),
+            options, on, options, None)
+
+@callback(
+    Output("pull-job",        "data"),
+    Output("pull-status",     "data", allow_duplicate=True),
+    Output("pull-poll",       "disabled", allow_duplicate=True),
     Input("api-btn",          "n_clicks"),
     prevent_initial_call=True
 )
 def pull_cases(n_clicks):
 
     if not n_clicks:
-        return dash.no_update, dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update
 
     # (optional) also check that the trigger *was* the button
     if dash.callback_context.triggered_id != "api-btn":
-        return dash.no_update, dash.no_update
+        return dash.no_update, dash.no_update, dash.no_update
 
     api_type = session.get("api_type")
     base_url = session.get("api_url")
@@ -1284,56 +2662,124 @@ def pull_cases(n_clicks):
     pwd = crypto.decrypt_secret(pwd_enc) if pwd_enc else None
     key = crypto.decrypt_secret(key_enc) if key_enc else None
 
-    if api_type == "so":
-        handler = OnionHandler(base_url=base_url,
-                               username=user,
-                               password=pwd,
-                               api_key=key)
-        
-    if api_type == "kb":
-        handler = KibanaHandler(base_url=base_url,
-                               username=user,
-                               password=pwd,
-                               api_key=key)
-
-
-    raw_json = handler.login_and_cases()
-    cases_obj = json.loads(raw_json)["cases"]
-
-    cases_obj = [c for c in cases_obj if "chainsmoker" in c.get("tags", [])]
-
-    handler.cases_to_dataframe(cases_obj)
-    df_new = handler.cases  # pandas.DataFrame
-
-    for _, row in df_new.iterrows():
-        ac = AttackChain(
-            date_time_mpnet     = row["Date/Time MPNET"],
-            mitre_tactic        = row["MITRE Tactic"],
-            src_ip              = row["Source Hostname/IP"],
-            dst_ip              = row["Target Hostname/IP"],
-            details             = row["Details"],
-            notes               = row["Notes"],
-            operator            = row["Operator"],
-            attack_chain_name   = row["Attack Chain"],
-        )
-        db.session.add(ac)
+    # one pull per API config at a time; a second click follows the running one
+    job, started = pull_jobs.submit((api_type, base_url, user or ""),
+                                    run_pull, api_type, base_url, user, pwd, key)
+    status = job.snapshot()
+    if not started:
+        status["note"] = "A pull for this API is already running."
+    return job.id, status, False
 
-    db.session.commit()
+@callback(
+    Output("pull-status",     "data", allow_duplicate=True),
+    Output("pull-poll",       "disabled", allow_duplicate=True),
+    Output("fig-token",       "data", allow_duplicate=True),
+    Input("pull-poll",        "n_intervals"),
+    State("pull-job",         "data"),
+    prevent_initial_call=True
+)
+def poll_pull(_, job_id):
+    job = pull_jobs.get(job_id) if job_id else None
+    if job is None:
+        return None, True, dash.no_update
+    status = job.snapshot()
+    if job.status == "running":
+        return status, False, dash.no_update
+    if job.status == "done" and job.result["written"]:
+        return status, True, current_fig_token()
+    return status, True, dash.no_update
+
+# assets/live.js polls /api/version (If-None-Match) while the event stream
+# is down, and only writes data-version when it differs from the one
+# fig-meta was built at
+app.clientside_callback(
+    ClientsideFunction(namespace="live", function_name="checkVersion"),
+    Output("data-version",    "data"),
+    Input("version-poll",     "n_intervals"),
+    State("fig-meta",         "data"),
+    prevent_initial_call=True
+)
 
-    fig_normal, fig_all, missing_t, visible_t, all_t = chainsmoker_db()
-    fig_store = {
-        "normal": fig_normal.to_dict(),
-        "all":    fig_all.to_dict()
-    }
+@callback(
+    Output("fig-token",       "data", allow_duplicate=True),
+    Input("data-version",     "data"),
+    State("fig-meta",         "data"),
+    prevent_initial_call=True
+)
+def refresh_on_change(version, meta):
+    """Refetch figures once the data version moved (scheduled syncs, other
+    users' edits while the event stream is unavailable)."""
+    if version is None or (meta and meta.get('version') == version):
+        raise dash.exceptions.PreventUpdate
+    return current_fig_token()
+
+# assets/live.js opens the /api/events stream and feeds it into live-event
+app.clientside_callback(
+    ClientsideFunction(namespace="live", function_name="connect"),
+    Output("live-event",      "data"),
+    Input("client-id",        "data"),
+)
 
-    return dbc.Alert(
-            f"✅ Retrieved {len(df_new)} case(s)",
-            color="success",
-            dismissable=True,
-            fade=False
-        ), fig_store
+# assets/live.js: applies a live event to this tab without asking the
+# server. Deltas are patched into fig-store, anything else moves fig-token
+# (refetch); a comment on the node in the notes panel writes notes-refresh.
+app.clientside_callback(
+    ClientsideFunction(namespace="live", function_name="applyEvent"),
+    Output("fig-store",       "data", allow_duplicate=True),
+    Output("fig-meta",        "data", allow_duplicate=True),
+    Output("fig-token",       "data", allow_duplicate=True),
+    Output("notes-refresh",   "data"),
+    Input("live-event",       "data"),
+    State("fig-store",        "data"),
+    State("fig-meta",         "data"),
+    State("client-id",        "data"),
+    State("shown-node",       "data"),
+    prevent_initial_call=True
+)
 
+app.clientside_callback(
+    ClientsideFunction(namespace="live", function_name="shownNode"),
+    Output("shown-node",      "data"),
+    Input("attack-chain-graph", "clickData"),
+)
+
+def pull_status_view(status):
+    if not status:
+        return None
+    if status["status"] == "error":
+        return dbc.Alert(f"⚠️ Pull failed: {status['error']}", color="danger",
+                         dismissable=True, fade=False)
+    if status["status"] == "done":
+        r = status["result"]
+        return dbc.Alert(
+                f"✅ Synced {r['fetched']} changed case(s): {r['written']} new/updated, "
+                f"{r['unchanged']} unchanged ({r['rate']:,.0f} rows/s)",
+                color="success",
+                dismissable=True,
+                fade=False
+            )
+
+    total = status["total"]
+    pct = 100 * status["done"] / total if total else 100
+    label = f"{status['done']:,}/{total:,}" if total else (f"{status['done']:,}" if status["done"] else "")
+    return html.Div([
+        html.Small(status.get("note") or f"⏳ {status['stage'].capitalize()}…"),
+        dbc.Progress(value=pct, label=label, striped=True, animated=True,
+                     style={"minWidth": "240px"}),
+    ])
+
+# pull-status is always mounted, the feedback span only on the settings page:
+# ALL matches nothing elsewhere, so a pull finishing after the user navigated
+# away is a no-op, and the span shows the last status again once remounted
 @callback(
+    Output({"type": "pull-feedback", "index": ALL}, "children"),
+    Input("pull-status",      "data"),
+)
+def render_pull_status(status):
+    return [pull_status_view(status)] * len(dash.callback_context.outputs_list)
+
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="toggleForms"),
     Output("collapse-notes", "is_open"),
     Output("collapse-node",  "is_open"),
     Output("note-alert",     "children"),
@@ -1343,197 +2789,154 @@ def pull_cases(n_clicks):
     State("collapse-node",   "is_open"),
     State("attack-chain-graph", "clickData")
 )
-def toggle_forms(n_notes, n_node, open_notes, open_node, clickData):
-    ctx = dash.callback_context.triggered_id
-
-    # If the user clicked “Add Note”
-    if ctx == "btn-toggle-notes":
-        # If no node is selected in the graph, show an alert and keep both collapsed
-        if not clickData or not clickData.get("points"):
-            alert = dbc.Alert(
-              "You must click a node first",
-              color="indianred",
-              duration=4000,
-              is_open=True,
-              dismissable=True
-            )
-            return False, False, alert
-
-        # Otherwise, clear any alert and toggle the notes panel
-        return (not open_notes), False, dash.no_update
-
-    # If the user clicked “Add Node” – just close notes, clear any alert, and toggle node panel
-    if ctx == "btn-toggle-node":
-        return False, (not open_node), dash.no_update
-
-    # on initial load or anything else – hide both panels + clear alert
-    return False, False, dash.no_update
 
-@callback(
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="toggleDeleteButton"),
     Output("btn-delete-node", "disabled"),
     Input("attack-chain-graph", "clickData"),
 )
-def toggle_delete_button(clickData):
-    # Enable delete once you have valid clickData / row_id
-    if clickData and hash_node(clickData):
-        return False
-    return True
 
 @callback(
     Output("delete-fdbk", "children"),
     Output("fig-store",  "data", allow_duplicate=True),
+    Output("fig-token",  "data", allow_duplicate=True),
     Input("btn-delete-node",  "n_clicks"),
     State("attack-chain-graph", "clickData"),
+    State("fig-meta",    "data"),
+    State("client-id",   "data"),
     prevent_initial_call=True
 )
-def delete_selected_node(n_clicks, clickData):
+def delete_selected_node(n_clicks, clickData, meta, client_id):
     if not n_clicks:
         raise dash.exceptions.PreventUpdate
 
     node_id = hash_node(clickData)
     if not node_id:
-        return "Error: no node selected.", dash.no_update
+        return "Error: no node selected.", dash.no_update, dash.no_update
 
     # delete from DB
     chain = AttackChain.query.filter_by(row_id=int(node_id)).first()
     if not chain:
-        return f"Node {node_id} not found in database.", dash.no_update
+        return f"Node {node_id} not found in database.", dash.no_update, dash.no_update
+
+    # remember where the node sat in its trace before it goes away
+    pos, n_before = chain_position(db.session.connection(), chain)
+    tactic_left = db.session.query(AttackChain.row_id).filter(
+        AttackChain.mitre_tactic == chain.mitre_tactic,
+        AttackChain.row_id != chain.row_id).first() is not None
+    evt = {"type": "node_deleted", "row_id": chain.row_id,
+           "chain": chain.attack_chain_name, "tactic": chain.mitre_tactic,
+           "pos": pos, "n_before": n_before, "tactic_left": tactic_left}
 
     db.session.delete(chain)
+    queue_live_event(evt)
+    set_live_origin(client_id)
     db.session.commit()
 
-    # rebuild figures
-    fig_normal, fig_all, *_ = chainsmoker_db()
-    fig_store = {
-        'normal': fig_normal.to_dict(),
-        'all':    fig_all.to_dict()
-    }
+    feedback = dbc.Alert("Deleted Node Successfully", color="warning", duration=4000)
 
-    return dbc.Alert("Deleted Node Successfully", color="warning", duration=4000), fig_store
+    patch = patch_node_deleted(meta, evt)
+    if patch is not None:
+        return feedback, patch, dash.no_update
 
-@callback(
+    return feedback, dash.no_update, current_fig_token()
+
+# assets/ui.js posts the file to /api/import, which streams it into the
+# database, then moves fig-token to the version the import left behind
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="importUpload"),
     Output("upload-feedback", "children"),
-    Output("fig-store", "data", allow_duplicate=True),
+    Output("fig-token", "data", allow_duplicate=True),
     Input("upload-data", "contents"),
     State("upload-data", "filename"),
     prevent_initial_call=True
 )
-def ingest_upload(contents, filename):
-    import base64
-    if not contents:
-        raise dash.exceptions.PreventUpdate
-
-    # Decode uploaded file
-    content_type, content_string = contents.split(",")
-    decoded = base64.b64decode(content_string)
-    data = json.loads(decoded.decode("utf-8"))
-
-    attack_rows = data.get("attack_chain", [])
-    comment_rows = data.get("node_comments", [])
-
-    inserted, skipped = 0, 0
-
-    existing_attack_ids = {row.row_id for row in AttackChain.query.all()}
-    existing_comment_ids = {row.id for row in NodeComment.query.all()}
-
-    for row in attack_rows:
-        if row["row_id"] in existing_attack_ids:
-            skipped += 1
-            continue
-        db.session.add(AttackChain(**row))
-        inserted += 1
-
-    for row in comment_rows:
-        if row["id"] in existing_comment_ids:
-            skipped += 1
-            continue
-        db.session.add(NodeComment(**row))
-        inserted += 1
 
-    db.session.commit()
-
-    # 🔥 Rebuild graphs after import
-    fig_normal, fig_all, *_ = chainsmoker_db()
-    fig_store = {
-        "normal": fig_normal.to_dict(),
-        "all":    fig_all.to_dict()
-    }
-
-    return (
-        dbc.Alert(
-            f"✅ Imported {inserted} rows, skipped {skipped} duplicates.",
-            color="success", dismissable=True
-        ),
-        fig_store
-    )
 
-
-@callback(
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="enableWipeButton"),
     Output("btn-wipe-db", "disabled"),
-    Input("wipe-confirm", "value")
+    Output("btn-purge-chains", "disabled"),
+    Input("wipe-confirm", "value"),
+    Input("purge-chains", "value")
 )
-def enable_wipe_button(confirm_text):
-    return confirm_text != "saturn burger"  # button enabled only if exact match
 
 @callback(
     Output("wipe-feedback", "children"),
-    Output("fig-store", "data", allow_duplicate=True),
+    Output("fig-token", "data", allow_duplicate=True),
+    Output("purge-chains", "options", allow_duplicate=True),
     Input("btn-wipe-db", "n_clicks"),
     State("wipe-confirm", "value"),
     prevent_initial_call=True
 )
 def wipe_database(n_clicks, confirm_text):
     if confirm_text != "saturn burger":
-        return dbc.Alert("❌ Confirmation failed. Type 'saturn burger' to proceed.", color="danger"), dash.no_update
+        return dbc.Alert("❌ Confirmation failed. Type 'saturn burger' to proceed.", color="danger"), dash.no_update, dash.no_update
 
     try:
-        # Remove all rows from both tables
-        db.session.query(NodeComment).delete()
-        db.session.query(AttackChain).delete()
+        started = time.perf_counter()
+        truncate_chains()
+        # bulk statements skip the flush hook
+        note_chain_bump(db.session, bump_chain_version(db.session.connection()))
         db.session.commit()
+        elapsed = time.perf_counter() - started
 
         # Rebuild figures (empty state)
-        fig_normal, fig_all, *_ = chainsmoker_db()
-        fig_store = {
-            "normal": fig_normal.to_dict(),
-            "all": fig_all.to_dict()
-        }
-
         return (
-            dbc.Alert("💀 Database wiped successfully.", color="danger", duration=4000),
-            fig_store
+            dbc.Alert(f"💀 Database wiped successfully in {elapsed * 1000:,.0f} ms.",
+                      color="danger", duration=4000),
+            current_fig_token(),
+            []
         )
 
     except Exception as e:
         db.session.rollback()
-        return dbc.Alert(f"⚠️ Error: {e}", color="warning"), dash.no_update
+        return dbc.Alert(f"⚠️ Error: {e}", color="warning"), dash.no_update, dash.no_update
 
 @callback(
-    Output("download-db", "data"),
-    Output("export-feedback", "children"),
-    Input("export-btn", "n_clicks"),
+    Output("wipe-feedback", "children", allow_duplicate=True),
+    Output("fig-token", "data", allow_duplicate=True),
+    Output("purge-chains", "options", allow_duplicate=True),
+    Output("purge-chains", "value"),
+    Input("btn-purge-chains", "n_clicks"),
+    State("purge-chains", "value"),
+    State("wipe-confirm", "value"),
     prevent_initial_call=True
 )
-def export_data_cb(n_clicks):
-    if not n_clicks:
+def purge_selected_chains(n_clicks, chains, confirm_text):
+    if confirm_text != "saturn burger":
+        return dbc.Alert("❌ Confirmation failed. Type 'saturn burger' to proceed.", color="danger"), dash.no_update, dash.no_update, dash.no_update
+    if not chains:
         raise dash.exceptions.PreventUpdate
 
-    # Pull both tables into pandas DataFrames
-    attack_df = pd.read_sql_table("attack_chain", db.engine)
-    comments_df = pd.read_sql_table("node_comments", db.engine)
+    try:
+        started = time.perf_counter()
+        nodes, comments = purge_chains(chains)
+        if nodes:
+            note_chain_bump(db.session, bump_chain_version(db.session.connection()))
+        db.session.commit()
+        elapsed = time.perf_counter() - started
 
-    export = {
-        "attack_chain": json.loads(attack_df.to_json(orient="records", date_format="iso")),
-        "node_comments": json.loads(comments_df.to_json(orient="records", date_format="iso"))
-    }
+        return (
+            dbc.Alert(f"🔥 Purged {len(chains)} chain(s): {nodes:,} nodes, {comments:,} comments "
+                      f"in {elapsed * 1000:,.0f} ms. Pulled cases from these chains won't be "
+                      f"synced again; wipe the database to start over.",
+                      color="danger", duration=8000),
+            current_fig_token() if nodes else dash.no_update,
+            chain_options(),
+            []
+        )
 
-    return (
-        dict(
-            content=json.dumps(export, indent=2),
-            filename="chainsmoker_export.json"
-        ),
-        dbc.Alert("✅ Database exported successfully.", color="success", dismissable=True)
-    )
+    except Exception as e:
+        db.session.rollback()
+        return dbc.Alert(f"⚠️ Error: {e}", color="warning"), dash.no_update, dash.no_update, dash.no_update
+
+app.clientside_callback(
+    ClientsideFunction(namespace="ui", function_name="exportHref"),
+    Output("export-btn", "href"),
+    Input("export-format", "value"),
+    Input("export-gzip", "value")
+)
 
 
 
@@ -1545,5 +2948,6 @@ def export_data_cb(n_clicks):
 
 
 if __name__ == '__main__':
+    start_sync_scheduler()
     app.run(port=8080, host='0.0.0.0')
 
@@ -0,0 +1,199 @@
+"""Stand-in for Security Onion / Kibana, for trying case pulls without one.
+
+Serves just what utility/handler.py talks to:
+
+    /auth/self-service/login/browser, /login/flows, /login   Kratos login flow
+    [/kibana]/internal/security/login                          Kibana basic login
+    [/kibana]/api/cases/_find                                  paged, sorted cases
+
+_find behaves like Kibana where the sync depends on it: perPage is capped at
+100, a page past the 10,000-hit result window is a 400, and missing stamps
+sort last. from/to bound the sort field (inclusive), which is what the
+handler's keyset paging narrows on.
+
+Run it from the repo root and save an API config pointing at it (either API
+type; the Security Onion one is mounted under /kibana):
+
+    python app/stub_kibana.py --cases 2000 --port 5601
+    # base URL http://localhost:5601, username analyst, password stub
+
+--touch N re-stamps N random cases every minute, so scheduled syncs have
+changes to pick up. --broken-flow drops the flow id from the Kratos redirect,
+which is what sends OnionHandler to its Selenium fallback.
+"""
+import argparse
+import random
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask, abort, jsonify, make_response, redirect, request
+
+MITRE = ["Initial Access", "Execution", "Persistence", "Privilege Escalation",
+         "Defense Evasion", "Credential Access", "Discovery", "Lateral Movement",
+         "Collection", "C2", "Exfiltration"]
+# handler.cases_to_dataframe reads customFields by position, in this order
+FIELDS = ["attack_chain_name", "date_time_mpnet", "details", "mitre_tactic",
+          "notes", "operator", "src_ip", "dst_ip"]
+MAX_PER_PAGE = 100
+MAX_RESULT_WINDOW = 10000
+
+def iso(ts):
+    return ts.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+def parse_iso(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+def make_case(i, rng, now):
+    when = now - timedelta(minutes=rng.randint(0, 60 * 24 * 180))
+    # a third of the cases have been edited since they were opened
+    edited = when + (now - when) * rng.random() if i % 3 == 0 else None
+    values = {
+        "attack_chain_name": f"stub-chain-{i % 25}",
+        "date_time_mpnet": when.strftime("%m/%d/%Y, %H%M"),
+        "details": f"stub case {i}",
+        "mitre_tactic": rng.choice(MITRE),
+        "notes": None,
+        "operator": rng.choice(["alice", "bob", "carol"]),
+        "src_ip": f"10.0.{i % 200}.{i % 250}",
+        "dst_ip": "10.1.0.1",
+    }
+    return {
+        "id": f"stub-{i:06d}",
+        "tags": ["chainsmoker"] if i % 10 else ["unrelated"],
+        "title": f"Stub case {i}",
+        "status": "open",
+        "created_at": iso(when),
+        "updated_at": iso(edited) if edited else None,
+        "customFields": [{"key": k, "type": "text", "value": values[k]} for k in FIELDS],
+    }
+
+def create_app(n_cases, username, password, broken_flow=False, seed=7):
+    app = Flask(__name__)
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    cases = [make_case(i, rng, now) for i in range(n_cases)]
+    lock = threading.Lock()
+    flows = {}              # flow id -> csrf token
+    sessions = set()        # Kratos session and Kibana sid cookie values
+
+    def touch(n=0, ids=()):
+        """Re-stamp n random cases, or the ones in ids, as edited just now."""
+        stamp = iso(datetime.now(timezone.utc).replace(tzinfo=None))
+        with lock:
+            picked = ([c for c in cases if c["id"] in set(ids)] if ids
+                      else rng.sample(cases, min(n, len(cases))))
+            for case in picked:
+                case["updated_at"] = stamp
+    app.touch = touch
+    app.cases = cases
+
+    @app.get("/auth/self-service/login/browser")
+    def kratos_browser():
+        flow = secrets.token_hex(8)
+        flows[flow] = secrets.token_hex(8)
+        return redirect("/login" if broken_flow else f"/login?flow={flow}")
+
+    @app.get("/login")
+    def login_page():
+        return "<html><body>login</body></html>"
+
+    @app.get("/auth/self-service/login/flows")
+    def kratos_flow():
+        flow = request.args.get("id")
+        if flow not in flows:
+            abort(404)
+        return jsonify(ui={
+            "action": f"{request.host_url.rstrip('/')}/auth/self-service/login?flow={flow}",
+            "nodes": [{"attributes": {"name": "csrf_token", "value": flows[flow]}},
+                      {"attributes": {"name": "identifier"}},
+                      {"attributes": {"name": "password"}}],
+        })
+
+    @app.post("/auth/self-service/login")
+    def kratos_submit():
+        flow = request.args.get("flow")
+        if flows.get(flow) != request.form.get("csrf_token"):
+            return jsonify(error={"id": "security_csrf_violation"}), 403
+        if (request.form.get("identifier"), request.form.get("password")) != (username, password):
+            return jsonify(ui={"messages": [{"type": "error",
+                                             "text": "The provided credentials are invalid"}]}), 400
+        token = secrets.token_hex(16)
+        sessions.add(token)
+        response = make_response(redirect("/"))
+        response.set_cookie("ory_kratos_session", token)
+        return response
+
+    @app.get("/")
+    def home():
+        return "<html><body>stub</body></html>"
+
+    def authorised():
+        auth = request.headers.get("Authorization", "")
+        return (auth.startswith("ApiKey ") or request.cookies.get("sid") in sessions)
+
+    def kibana_login():
+        params = (request.get_json(silent=True) or {}).get("params", {})
+        if (params.get("username"), params.get("password")) != (username, password):
+            return jsonify(statusCode=401, message="Unauthorized"), 401
+        token = secrets.token_hex(16)
+        sessions.add(token)
+        response = make_response("", 204)
+        response.set_cookie("sid", token)
+        return response
+
+    def find_cases():
+        if not authorised():
+            return jsonify(statusCode=401, message="Unauthorized"), 401
+        page = int(request.args.get("page", 1))
+        per_page = min(int(request.args.get("perPage", 20)), MAX_PER_PAGE)
+        if page * per_page > MAX_RESULT_WINDOW:
+            return jsonify(statusCode=400, error="Bad Request",
+                           message=f"Result window is too large, page * perPage must be "
+                                   f"less than or equal to: [{MAX_RESULT_WINDOW}]"), 400
+        field = "updated_at" if request.args.get("sortField") == "updatedAt" else "created_at"
+        tags = set(request.args.getlist("tags"))
+        lo, hi = (parse_iso(request.args[k]) if request.args.get(k) else None
+                  for k in ("from", "to"))
+        with lock:
+            found = [c for c in cases if not tags or tags & set(c["tags"])]
+            if lo or hi:
+                found = [c for c in found if c[field]
+                         and (lo is None or parse_iso(c[field]) >= lo)
+                         and (hi is None or parse_iso(c[field]) <= hi)]
+            # like Kibana: missing stamps sort last
+            found.sort(key=lambda c: c[field] or "", reverse=request.args.get("sortOrder") != "asc")
+            start = (page - 1) * per_page
+            return jsonify(page=page, per_page=per_page, total=len(found),
+                           cases=found[start:start + per_page])
+
+    for root in ("", "/kibana"):
+        app.add_url_rule(f"{root}/internal/security/login", f"login{root}",
+                         kibana_login, methods=["POST"])
+        app.add_url_rule(f"{root}/api/cases/_find", f"find{root}", find_cases)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=5601)
+    parser.add_argument("--cases", type=int, default=500)
+    parser.add_argument("--username", default="analyst")
+    parser.add_argument("--password", default="stub")
+    parser.add_argument("--touch", type=int, default=0,
+                        help="cases to re-stamp every minute")
+    parser.add_argument("--broken-flow", action="store_true",
+                        help="leave the flow id out of the Kratos redirect")
+    args = parser.parse_args()
+
+    app = create_app(args.cases, args.username, args.password, args.broken_flow)
+    if args.touch:
+        def loop():
+            while True:
+                time.sleep(60)
+                app.touch(args.touch)
+        threading.Thread(target=loop, daemon=True).start()
+    app.run(port=args.port)
+
+if __name__ == "__main__":
+    main()
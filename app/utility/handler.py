@@ -4,6 +4,15 @@ from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
+from urllib.parse import urlencode, urlparse, parse_qs
+from contextlib import contextmanager
+import hashlib
+import os
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import json
 import requests
 import pandas as pd
 
@@ -285,90 +294,185 @@ sample_cases = {
   "per_page": 5
 }
 
-class OnionHandler:
-    def __init__(self, base_url="https://security-onion.local", username="soadmin", password="yourpassword", api_key = 'No API Key Found', cases = pd.DataFrame()):
-        self.base_url = base_url
-        self.username = username
-        self.password = password
-        self.cookies = {}
-        self.api_key = api_key
-        self.cases=cases
-
-    def login_and_cases(self):
-        options = Options()
-        options.headless = True
-
-        driver = webdriver.Remote(
-            command_executor="http://selenium:4444/wd/hub",
-            options=options
-        )
-
-        login_url = f"{self.base_url}/kibana/wiwi"
-        driver.get(login_url)
+NO_API_KEY = 'No API Key Found'
+# Kibana caps /api/cases/_find at 100 cases a page
+MAX_PER_PAGE = 100
+HTTP_TIMEOUT = 30
+HTTP_POOL_SIZE = 10
+# logged-in handlers are reused for this long before logging in again
+SESSION_TTL = int(os.environ.get("CHAINSMOKER_SESSION_TTL", "900"))
 
-        # Wait for CSRF field and form elements
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "csrf_token")))
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "identifier")))
+class LoginError(Exception):
+    pass
 
-        csrf_token = driver.find_element(By.NAME, "csrf_token").get_attribute("value")
-        driver.find_element(By.NAME, "identifier").send_keys(self.username)
-        driver.find_element(By.NAME, "password").send_keys(self.password)
-        driver.find_element(By.NAME, "csrf_token").submit()
+class LoginRejected(LoginError):
+    """The server answered and turned the credentials down. A browser won't
+    do any better, so this is never a reason to fall back to Selenium."""
 
+def case_stamp(case, field="updated_at"):
+    """Naive-UTC datetime of a case timestamp field, None if unset."""
+    value = case.get(field)
+    if not value:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return ts.to_pydatetime()
 
-        # ✅ Get cookies
-        # raw_cookies = driver.get_cookies()
-        # self.cookies = {c['name']: c['value'] for c in raw_cookies}
+def kibana_time(ts):
+    """ISO-8601 UTC string for a naive-UTC datetime, as Kibana stamps cases."""
+    return ts.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
 
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "username")))
-        driver.find_element(By.NAME, "username").send_keys(self.username)
-        driver.find_element(By.NAME, "password").send_keys(self.password)
+class CaseHandler:
+    """Case paging + flattening shared by the Security Onion and Kibana handlers.
 
-        driver.find_element(By.CSS_SELECTOR, 'button[data-test-subj="loginSubmit"]').click()
+    Talks to Kibana over a pooled requests.Session; api_root is where Kibana
+    is mounted under base_url.
+    """
+    cases_path = "/api/cases/_find"
+    api_root = ""
 
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Not Found')]"))
-        )   
-
-        login_url = f"{self.base_url}/kibana/api/cases/_find"
-        driver.get(login_url)
+    def __init__(self, base_url, username, password, api_key=NO_API_KEY, cases=None):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.cookies = {}
+        self.api_key = api_key
+        self.cases = pd.DataFrame() if cases is None else cases
+        self.http = None
+        self.logged_in = False
 
-        driver.find_element(By.ID, "rawdata-tab").click()
+    def has_api_key(self):
+        return bool(self.api_key) and self.api_key != NO_API_KEY
 
+    def _http(self):
+        if self.http is None:
+            http = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE,
+                pool_maxsize=HTTP_POOL_SIZE,
+                max_retries=Retry(total=3, backoff_factor=0.5,
+                                  status_forcelist=(502, 503, 504),
+                                  allowed_methods=["GET"]),
+            )
+            http.mount("https://", adapter)
+            http.mount("http://", adapter)
+            http.verify = False
+            http.headers["kbn-xsrf"] = "true"
+            if self.has_api_key():
+                http.headers["Authorization"] = f"ApiKey {self.api_key}"
+            self.http = http
+        return self.http
 
-        pre = WebDriverWait(driver, 10).until(
-            EC.visibility_of_element_located((By.TAG_NAME, "pre"))
+    def _kibana_login(self):
+        """Kibana basic-provider login; leaves the sid cookie on the session."""
+        response = self._http().post(
+            f"{self.base_url}{self.api_root}/internal/security/login",
+            json={
+                "providerType": "basic",
+                "providerName": "basic",
+                "currentURL": f"{self.base_url}{self.api_root}/login",
+                "params": {"username": self.username, "password": self.password},
+            },
+            timeout=HTTP_TIMEOUT,
         )
-        raw_json = pre.text
-        
-        driver.quit()
-
-        return raw_json
+        if response.status_code in (401, 403):
+            raise LoginRejected(f"Kibana rejected the login ({response.status_code})")
+        response.raise_for_status()
 
+    def login(self):
+        if not self.has_api_key():
+            self._kibana_login()
+        self.cookies = self._http().cookies.get_dict()
+        self.logged_in = True
 
+    def reusable(self):
+        """Whether this handler may be parked in the session cache."""
+        return self.logged_in
 
+    def _get(self, path, params=None):
+        url = f"{self.base_url}{self.api_root}{path}"
+        response = self._http().get(url, params=params, timeout=HTTP_TIMEOUT)
+        if response.status_code == 401:
+            # session expired server-side: log in again once and retry
+            self.close()
+            self.login()
+            response = self._http().get(url, params=params, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
 
-        #driver.quit()
+    def get_json(self, path, params=None):
+        if not self.logged_in:
+            self.login()
+        return self._get(path, params)
 
     def query_kibana_cases(self):
+        return self.get_json(self.cases_path)
 
-        if not self.cookies:
-            self.login()
+    def close(self):
+        if self.http is not None:
+            self.http.close()
+            self.http = None
+        self.logged_in = False
 
-        url = f"{self.base_url}:9200/api/cases/_find"
-        headers = {
-            "Authorization": f"ApiKey {self.api_key}"
-        }
+    def find_cases(self, page=1, per_page=100, sort_field="updatedAt", tags=None,
+                   start=None, end=None):
+        """One page of /api/cases/_find, newest first on sort_field, limited to
+        cases stamped between start and end (inclusive) on that field."""
+        params = {"page": page, "perPage": min(per_page, MAX_PER_PAGE),
+                  "sortField": sort_field, "sortOrder": "desc"}
+        if tags:
+            params["tags"] = list(tags)
+        if start:
+            params["from"] = start
+        if end:
+            params["to"] = end
+        return self.get_json(self.cases_path, params)
 
-        response = requests.get(
-            url,
-            headers=headers,
-            cookies=self.cookies,  # Pass cookies from login() directly
-            verify=False  # Disable SSL verification (use cautiously in production)
-        )
+    def changed_cases(self, since=None, per_page=100, tags=None, progress=None):
+        """Every case created or updated at/after `since` (all cases when None).
 
-        response.raise_for_status()
-        return response.json()
+        Keyset paging, newest first: each request's window ends at the oldest
+        stamp the previous page returned, so the walk stays on page 1 however
+        big the tenant is (Kibana refuses pages past 10,000 hits), and a case
+        edited mid-walk jumps out of the window instead of pushing the rest
+        down a slot; the next sync picks it up. Only a page that is all one
+        stamp moves on by page number, and case ids drop the repeats.
+
+        Never-edited cases have no updated_at, so they come from a second pass
+        on createdAt, the only pass on a full walk. progress(stage, done,
+        total) is called after every page.
+        """
+        per_page = min(per_page, MAX_PER_PAGE)
+        start = kibana_time(since) if since is not None else None
+        passes = [("createdAt", "created_at")]
+        if since is not None:
+            passes.insert(0, ("updatedAt", "updated_at"))
+        found, total = {}, 0
+        for sort_field, stamp_field in passes:
+            end, end_stamp, page = None, None, 1
+            while True:
+                body = self.find_cases(page, per_page, sort_field, tags, start, end)
+                batch = [c for c in body.get("cases", []) if case_stamp(c, stamp_field)]
+                if since is None and end is None and page == 1:
+                    total = body.get("total", 0)
+                newer = [c for c in batch
+                         if since is None or case_stamp(c, stamp_field) >= since]
+                for case in newer:
+                    found[case["id"]] = case
+                if progress:
+                    # total is only meaningful on a full walk
+                    progress("fetching cases", len(found), total)
+                if len(newer) < body.get("per_page", per_page):
+                    break       # window exhausted, or down to cases older than since
+                oldest = min(newer, key=lambda c: case_stamp(c, stamp_field))
+                stamp = case_stamp(oldest, stamp_field)
+                if end_stamp is not None and stamp >= end_stamp:
+                    page += 1   # a whole page on the boundary stamp
+                else:
+                    # the server's own string, so the bound matches it exactly
+                    end, end_stamp, page = oldest[stamp_field], stamp, 1
+        return list(found.values())
 
     def cases_to_dataframe(self, cases):
         # Define field order as they appear in customFields list:
@@ -394,6 +498,7 @@ class OnionHandler:
                 "description": case.get("description"),
                 "totalAlerts": case.get("totalAlerts"),
                 "created_at": case.get("created_at"),
+                "updated_at": case.get("updated_at"),
             }
             
             custom_fields = case.get("customFields", [])
@@ -414,12 +519,183 @@ class OnionHandler:
         return flat_cases
 
 
-class KibanaHandler:
-    def __init__(self, base_url="https://kibana.lan", username="elastic", password="yourpassword", api_key = 'No API Key Found', cases = pd.DataFrame()):
-        self.base_url = base_url
-        self.username = username
-        self.password = password
-        self.cookies = {}
-        self.api_key = api_key
-        self.cases=cases
+class OnionHandler(CaseHandler):
+    api_root = "/kibana"
+
+    def __init__(self, base_url="https://security-onion.local", username="soadmin", password="yourpassword", api_key = NO_API_KEY, cases = None):
+        super().__init__(base_url, username, password, api_key, cases)
+        self.driver = None
+        self.use_browser = False
+
+    def login(self):
+        """Security Onion (Kratos) login, then Kibana's own login, over HTTP."""
+        http = self._http()
+        response = http.get(f"{self.base_url}/auth/self-service/login/browser",
+                            timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        flow_id = parse_qs(urlparse(response.url).query).get("flow", [None])[0]
+        if not flow_id:
+            raise LoginError("no login flow in the Security Onion redirect")
+
+        response = http.get(f"{self.base_url}/auth/self-service/login/flows",
+                            params={"id": flow_id}, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        ui = response.json()["ui"]
+        csrf_token = next((n["attributes"].get("value") for n in ui["nodes"]
+                           if n["attributes"].get("name") == "csrf_token"), None)
+
+        response = http.post(ui["action"], data={
+            "method": "password",
+            "identifier": self.username,
+            "password": self.password,
+            "csrf_token": csrf_token,
+        }, timeout=HTTP_TIMEOUT)
+        # Kratos answers bad credentials with the flow again: 400 for a JSON
+        # client, 200 after the browser redirect; either way no session cookie
+        if response.status_code in (400, 401):
+            raise LoginRejected(f"Security Onion rejected the login ({response.status_code})")
+        response.raise_for_status()
+        if "ory_kratos_session" not in http.cookies:
+            raise LoginRejected("Security Onion rejected the login")
+
+        self._kibana_login()
+        self.cookies = http.cookies.get_dict()
+        self.logged_in = True
+
+    def get_json(self, path, params=None):
+        # HTTP first; drive a browser through the login forms only if the HTTP
+        # flow broke (transport error, a login page shaped unlike the one we
+        # know), never because the credentials were wrong
+        if not self.use_browser and not self.logged_in:
+            try:
+                self.login()
+            except LoginRejected:
+                raise
+            except (requests.RequestException, LoginError, KeyError):
+                self.use_browser = True
+        if self.use_browser:
+            return json.loads(self._raw(path, params))
+        return self._get(path, params)
+
+    def _browser_login(self):
+        options = Options()
+        options.headless = True
+
+        driver = webdriver.Remote(
+            command_executor="http://selenium:4444/wd/hub",
+            options=options
+        )
+
+        login_url = f"{self.base_url}/kibana/wiwi"
+        driver.get(login_url)
+
+        # Wait for CSRF field and form elements
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "csrf_token")))
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "identifier")))
+
+        csrf_token = driver.find_element(By.NAME, "csrf_token").get_attribute("value")
+        driver.find_element(By.NAME, "identifier").send_keys(self.username)
+        driver.find_element(By.NAME, "password").send_keys(self.password)
+        driver.find_element(By.NAME, "csrf_token").submit()
+
+
+        # ✅ Get cookies
+        # raw_cookies = driver.get_cookies()
+        # self.cookies = {c['name']: c['value'] for c in raw_cookies}
+
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "username")))
+        driver.find_element(By.NAME, "username").send_keys(self.username)
+        driver.find_element(By.NAME, "password").send_keys(self.password)
+
+        driver.find_element(By.CSS_SELECTOR, 'button[data-test-subj="loginSubmit"]').click()
+
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Not Found')]"))
+        )   
+
+        return driver
+
+    def _raw(self, path, params=None):
+        # one logged-in browser per handler, reused for every page
+        if self.driver is None:
+            self.driver = self._browser_login()
+
+        url = f"{self.base_url}{self.api_root}{path}"
+        if params:
+            url += "?" + urlencode(params, doseq=True)
+        self.driver.get(url)
+
+        self.driver.find_element(By.ID, "rawdata-tab").click()
+
+
+        pre = WebDriverWait(self.driver, 10).until(
+            EC.visibility_of_element_located((By.TAG_NAME, "pre"))
+        )
+        return pre.text
+
+    def close(self):
+        super().close()
+        if self.driver is not None:
+            self.driver.quit()
+            self.driver = None
+        self.use_browser = False
+
+    def reusable(self):
+        # never park a remote browser session in the cache
+        return self.logged_in and not self.use_browser
+
+    def login_and_cases(self):
+        try:
+            return json.dumps(self.get_json(self.cases_path))
+        finally:
+            self.close()
+
+
+class KibanaHandler(CaseHandler):
+    def __init__(self, base_url="https://kibana.lan", username="elastic", password="yourpassword", api_key = NO_API_KEY, cases = None):
+        super().__init__(base_url, username, password, api_key, cases)
+
+
+HANDLERS = {"so": OnionHandler, "kb": KibanaHandler}
+
+_session_cache = {}     # (api_type, base_url, username) -> [handler, creds digest, logged in at]
+_session_lock = threading.Lock()
+
+def _creds_digest(password, api_key):
+    return hashlib.sha256(f"{password}\0{api_key}".encode()).hexdigest()
+
+@contextmanager
+def cached_handler(api_type, base_url, username, password=None, api_key=None):
+    """Logged-in handler for an API config, reused across pulls.
+
+    Cached per (api_type, base_url, username) for SESSION_TTL seconds; changed
+    credentials, an error inside the block or a non-reusable handler (browser
+    fallback) drop the entry so the next pull starts clean.
+    """
+    key = (api_type, base_url, username or "")
+    digest = _creds_digest(password, api_key)
+    with _session_lock:
+        entry = _session_cache.pop(key, None)
+    if entry is not None and (entry[1] != digest or time.monotonic() - entry[2] > SESSION_TTL):
+        entry[0].close()
+        entry = None
+    if entry is None:
+        handler = HANDLERS[api_type](base_url=base_url, username=username,
+                                     password=password, api_key=api_key or NO_API_KEY)
+        entry = [handler, digest, time.monotonic()]
 
+    handler = entry[0]
+    try:
+        yield handler
+    except Exception:
+        handler.close()
+        raise
+    if not handler.reusable():
+        handler.close()
+        return
+    # checked out while in use, so two pulls never share one requests.Session
+    with _session_lock:
+        stale = _session_cache.get(key)
+        _session_cache[key] = entry
+    if stale is not None and stale[0] is not handler:
+        stale[0].close()
@@ -0,0 +1,78 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# finished jobs stay readable this long so a late poll still sees the result
+JOB_RETENTION = 3600
+
+class Job:
+    def __init__(self, key):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.stage = "queued"
+        self.done = 0
+        self.total = 0
+        self.status = "running"     # running | done | error
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+    def progress(self, stage, done=0, total=0):
+        self.stage, self.done, self.total = stage, done, total
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "stage": self.stage,
+            "done": self.done,
+            "total": self.total,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+        }
+
+class JobRunner:
+    """Thread-pool job runner that allows one running job per key.
+
+    fn(job, *args) runs on a worker thread and reports through job.progress();
+    its return value becomes job.result.
+    """
+    def __init__(self, max_workers=2):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers,
+                                       thread_name_prefix="chainsmoker-job")
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, key, fn, *args):
+        """Start fn for key. Returns (job, started); started is False when a
+        job for the same key is still running, which is returned instead."""
+        with self.lock:
+            self._prune()
+            for job in self.jobs.values():
+                if job.key == key and job.status == "running":
+                    return job, False
+            job = Job(key)
+            self.jobs[job.id] = job
+        self.pool.submit(self._run, job, fn, args)
+        return job, True
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job, fn, args):
+        try:
+            job.result = fn(job, *args)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "error"
+        finally:
+            job.finished_at = time.monotonic()
+
+    def _prune(self):
+        cutoff = time.monotonic() - JOB_RETENTION
+        for job_id in [j.id for j in self.jobs.values()
+                       if j.finished_at is not None and j.finished_at < cutoff]:
+            del self.jobs[job_id]
@@ -0,0 +1,165 @@
+import codecs
+import itertools
+import json
+import zlib
+
+READ_SIZE = 64 * 1024
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_TAIL = 6       # longest partial token: a \uXXXX escape
+
+class ExportFormatError(ValueError):
+    pass
+
+def read_chunks(stream, size=READ_SIZE):
+    """Iterate a file-like object's bytes `size` at a time."""
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+def peek_bytes(chunks, n):
+    """(first n bytes or fewer, the same chunks from the start) — for sniffing
+    a stream's magic number without losing it."""
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= n:
+            break
+    return head[:n], itertools.chain([head], chunks)
+
+def gunzip_chunks(chunks):
+    """Pass chunks through, inflating them on the way if they are gzipped.
+
+    Output is handed on READ_SIZE at a time, so a small file that inflates to
+    a huge one can't blow up memory either.
+    """
+    magic, chunks = peek_bytes(chunks, 2)
+    if magic != b"\x1f\x8b":
+        yield from chunks
+        return
+
+    z = zlib.decompressobj(wbits=31)
+    for data in chunks:
+        while data:
+            yield z.decompress(data, READ_SIZE)
+            data = z.unconsumed_tail
+    yield z.flush()
+
+class _TextBuffer:
+    """Decoded text with a read position; pulls more chunks on demand and
+    drops what has already been parsed."""
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.mark = None    # position more() must keep, for backtracking
+        self.eof = False
+
+    def more(self):
+        """Append the next chunk. False once the input is exhausted."""
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            new = self.utf8.decode(b"", final=True)
+        else:
+            new = self.utf8.decode(chunk)
+        keep = self.pos if self.mark is None else min(self.mark, self.pos)
+        self.text = self.text[keep:] + new
+        self.pos -= keep
+        if self.mark is not None:
+            self.mark -= keep
+        return True
+
+    def peek(self):
+        """Next non-whitespace character ("" at end of input), not consumed."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ""
+
+    def take(self, expected):
+        char = self.peek()
+        if not char or char not in expected:
+            raise ExportFormatError(f"expected {expected!r}, found {char or 'end of file'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete JSON value.
+
+        Only reads on when the decoder ran out of text; an error further back
+        is malformed input, and fails without buffering the rest of it.
+        """
+        self.peek()
+        while True:
+            try:
+                value, self.pos = _decoder.raw_decode(self.text, self.pos)
+                return value
+            except json.JSONDecodeError as e:
+                if not _truncated(e, self.text) or not self.more():
+                    raise ExportFormatError(f"invalid JSON: {e}") from None
+
+def _truncated(err, text):
+    """Whether a decode error may just be the text stopping mid-value.
+
+    Most such errors sit at the very end. A cut-off literal, number or \\uXXXX
+    escape is reported a few characters back, and an unterminated string at
+    its opening quote (a raw newline ends it sooner, so a stray quote in
+    NDJSON still fails on its own line).
+    """
+    return err.pos >= len(text) - _TAIL or err.msg.startswith("Unterminated string")
+
+def iter_export_rows(chunks):
+    """(table, row) pairs from a Chainsmoker export, read incrementally.
+
+    Accepts the JSON document ({"attack_chain": [...], ...}) and NDJSON
+    ({"table": ..., "row": {...}} per line), either of them gzipped. Only one
+    row's text is held at a time.
+    """
+    buf = _TextBuffer(gunzip_chunks(chunks))
+    buf.mark = buf.pos
+    buf.take("{")
+    if buf.peek() == '"':
+        key = buf.value()
+        buf.take(":")
+        if buf.peek() == "[":
+            buf.mark = None
+            yield from _document_rows(buf, key)
+            return
+    # not a document of arrays: rewind and read it as NDJSON
+    buf.pos, buf.mark = buf.mark, None
+    yield from _ndjson_rows(buf)
+
+def _document_rows(buf, key):
+    while True:
+        if buf.peek() == "[":
+            buf.take("[")
+            if buf.peek() == "]":
+                buf.take("]")
+            else:
+                while True:
+                    yield key, buf.value()
+                    if buf.take(",]") == "]":
+                        break
+        else:
+            buf.value()     # some other top-level field; not ours
+        if buf.take(",}") == "}":
+            return
+        key = buf.value()
+        buf.take(":")
+
+def _ndjson_rows(buf):
+    while buf.peek():
+        line = buf.value()
+        if not isinstance(line, dict) or "table" not in line or "row" not in line:
+            raise ExportFormatError('NDJSON lines must be {"table": ..., "row": {...}}')
+        yield line["table"], line["row"]
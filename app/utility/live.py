@@ -0,0 +1,35 @@
+import queue
+import threading
+
+class LiveBroker:
+    """In-process fan-out of change events to one queue per connected client.
+
+    A client that falls behind loses its oldest events rather than blocking
+    the publisher; events carry version numbers so it can tell and refetch.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.maxsize)
+        with self.lock:
+            self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+
+    def publish(self, event):
+        with self.lock:     # one publisher at a time, so the drop-oldest below can't race
+            for q in self.subscribers:
+                try:
+                    q.put_nowait(event)
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:     # the client drained it meanwhile
+                        pass
+                    q.put_nowait(event)
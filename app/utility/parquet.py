@@ -0,0 +1,128 @@
+import io
+import shutil
+import tempfile
+import zipfile
+
+import sqlalchemy as sa
+
+from utility.jsonstream import ExportFormatError
+
+ZIP_MAGIC = b"PK\x03\x04"
+# rows per Parquet row group: big enough for the dictionaries and zstd to
+# pay off, small enough that one group of Arrow columns stays a few MB
+ROW_GROUP_SIZE = 50_000
+# uploads up to this size are spooled in memory, bigger ones to a temp file
+SPOOL_SIZE = 16 * 1024 * 1024
+
+class ParquetUnavailable(RuntimeError):
+    pass
+
+def _pyarrow():
+    # optional dependency: only the Parquet export/import needs it
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ParquetUnavailable("Parquet support needs pyarrow (pip install pyarrow)") from None
+    return pa, pq
+
+def require_pyarrow():
+    """Raise ParquetUnavailable now rather than half way through a stream."""
+    _pyarrow()
+
+def arrow_schema(table):
+    """Arrow schema for an SQLAlchemy table; every column nullable, like the
+    JSON export."""
+    pa, _ = _pyarrow()
+    fields = []
+    for c in table.columns:
+        if isinstance(c.type, sa.Integer):
+            arrow_type = pa.int64()
+        elif isinstance(c.type, sa.DateTime):
+            arrow_type = pa.timestamp("us")
+        elif isinstance(c.type, sa.Boolean):
+            arrow_type = pa.bool_()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(c.name, arrow_type))
+    return pa.schema(fields)
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable stream the response generator drains as it goes."""
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def parquet_zip_chunks(tables, batches):
+    """A zip of one <table>.parquet per table, as byte chunks.
+
+    batches(table) yields lists of row dicts. Strings are dictionary-encoded
+    (tactic, chain and operator names repeat endlessly) and pages zstd
+    compressed; the zip itself stores them as-is.
+    """
+    pa, pq = _pyarrow()
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+        for table in tables:
+            schema = arrow_schema(table)
+            strings = [f.name for f in schema if pa.types.is_string(f.type)]
+            with zf.open(f"{table.name}.parquet", "w", force_zip64=True) as member, \
+                 pq.ParquetWriter(member, schema, use_dictionary=strings,
+                                  compression="zstd") as writer:
+                group, n = [], 0
+                for batch in batches(table):
+                    group.append(pa.Table.from_pylist(batch, schema))
+                    n += len(batch)
+                    if n >= ROW_GROUP_SIZE:
+                        writer.write_table(pa.concat_tables(group))
+                        group, n = [], 0
+                        yield sink.drain()
+                if group:
+                    writer.write_table(pa.concat_tables(group))
+            yield sink.drain()
+    yield sink.drain()
+
+def iter_parquet_rows(chunks, table_names, batch_size):
+    """(table, row) pairs from a parquet_zip_chunks() upload, tables in
+    table_names order, batch_size rows decoded at a time.
+
+    Zip and Parquet both keep their index at the end of the file, so the
+    upload is spooled first, and each member again so it can be seeked.
+    """
+    _, pq = _pyarrow()
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as upload:
+        for chunk in chunks:
+            upload.write(chunk)
+        upload.seek(0)
+        try:
+            zf = zipfile.ZipFile(upload)
+        except zipfile.BadZipFile as e:
+            raise ExportFormatError(f"not a Parquet export: {e}") from None
+
+        with zf:
+            members = set(zf.namelist())
+            for name in table_names:
+                if f"{name}.parquet" not in members:
+                    continue
+                with zf.open(f"{name}.parquet") as member, \
+                     tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+                    shutil.copyfileobj(member, spool)
+                    spool.seek(0)
+                    try:
+                        pf = pq.ParquetFile(spool)
+                    except Exception as e:      # pyarrow raises ArrowInvalid et al.
+                        raise ExportFormatError(f"{name}.parquet: {e}") from None
+                    for batch in pf.iter_batches(batch_size=batch_size):
+                        for row in batch.to_pylist():
+                            yield name, row
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the app imports its helpers as top-level modules (utility.handler, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "app"))